@@ -0,0 +1,20 @@
+from django.contrib import admin
+from django.db import transaction
+
+from .counters import change_counter, link_target
+
+
+class CountedLinkAdmin(admin.ModelAdmin):
+    """Связи, созданные или перенесённые в админке, тоже учитываются."""
+
+    def save_model(self, request, obj, form, change):
+        model, field, counter = link_target(type(obj))
+        moved = not change or field in form.changed_data
+        with transaction.atomic():
+            if change and moved:
+                change_counter(model, form.initial[field], counter, -1)
+            super().save_model(request, obj, form, change)
+            if moved:
+                change_counter(
+                    model, getattr(obj, f'{field}_id'), counter, 1
+                )
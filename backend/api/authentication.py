@@ -0,0 +1,137 @@
+"""
+Аутентификация по токену с кешем «токен → пользователь».
+
+Токен вместе с пользователем хранится в кеше AUTH_TOKEN_CACHE
+не дольше AUTH_TOKEN_CACHE_TIMEOUT секунд, поэтому запрос с известным
+токеном обходится без запросов к БД. Хеш пароля в кеш не попадает:
+check_password дочитывает его из БД. Запись удаляется после коммита
+при удалении токена (выход) и при сохранении пользователя, в том числе
+при смене пароля и is_active (сигналы в users.signals).
+
+Кеш используется, только если он общий для процессов (Redis,
+Memcached, файловый или в БД): удаление записи из локального кеша
+одного процесса не отзывало бы доступ в остальных до истечения TTL.
+С LocMemCache и DummyCache каждый запрос читает токен из БД.
+
+Промах кеша читает токен из основной БД, а не с реплики: только что
+выданный токен может ещё не дойти до неё.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .caches import shared_cache
+from .replicas import use_primary
+
+
+def get_token_cache():
+    """Кеш токенов или None, если настроенный кеш не общий."""
+    return shared_cache(settings.AUTH_TOKEN_CACHE)
+
+
+def token_queryset(model):
+    return model.objects.select_related('user').defer('user__password')
+
+
+def token_cache_key(key):
+    """Ключ записи кеша; сам токен в ключ не попадает."""
+    return f'auth:token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def forget_tokens(keys):
+    """Удаляет записи токенов из кеша после коммита транзакции."""
+    cache = get_token_cache()
+    cache_keys = [token_cache_key(key) for key in keys]
+    if cache is not None and cache_keys:
+        transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+def forget_user_tokens(user):
+    if get_token_cache() is not None:
+        forget_tokens(
+            Token.objects.filter(user=user).values_list('key', flat=True)
+        )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, берущая токен и пользователя из кеша."""
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        if cache is None:
+            return self._check_user(self._get_token(key))
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is None:
+            token = self._get_token(key)
+            cache.set(cache_key, token, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        return self._check_user(token)
+
+    def _get_token(self, key):
+        model = self.get_model()
+        try:
+            with use_primary():
+                return token_queryset(model).get(key=key)
+        except model.DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+
+    @staticmethod
+    def _check_user(token):
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token
+
+
+class AsyncTokenAuthentication(CachedTokenAuthentication):
+    """
+    Вариант с асинхронным методом aauthenticate для async_views: те же
+    заголовок, кеш, проверки и сообщения об ошибках, токен читается
+    асинхронным ORM.
+    """
+
+    async def aauthenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise AuthenticationFailed(
+                _('Invalid token header. No credentials provided.')
+            )
+        if len(auth) > 2:
+            raise AuthenticationFailed(_(
+                'Invalid token header. '
+                'Token string should not contain spaces.'
+            ))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed(_(
+                'Invalid token header. '
+                'Token string should not contain invalid characters.'
+            ))
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cache = get_token_cache()
+        cache_key = token_cache_key(key)
+        token = None if cache is None else await cache.aget(cache_key)
+        if token is None:
+            model = self.get_model()
+            try:
+                with use_primary():
+                    token = await token_queryset(model).aget(key=key)
+            except model.DoesNotExist:
+                raise AuthenticationFailed(_('Invalid token.'))
+            if cache is not None:
+                await cache.aset(
+                    cache_key, token, settings.AUTH_TOKEN_CACHE_TIMEOUT
+                )
+        return self._check_user(token)
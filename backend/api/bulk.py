@@ -0,0 +1,54 @@
+"""Общие части пакетных эндпоинтов: входной список id и карта итогов."""
+from http import HTTPStatus
+
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+BULK_MAX_IDS = 100
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False, max_length=BULK_MAX_IDS
+    )
+
+    def validate_ids(self, value):
+        """Повторы убираются с сохранением порядка."""
+        return list(dict.fromkeys(value))
+
+
+def get_bulk_ids(request):
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data['ids']
+
+
+def bulk_response(outcomes, success_status, unchanged_detail, errors=None):
+    """
+    Карта итогов {id: {'status': код, 'detail': сообщение}} с теми же
+    кодами и сообщениями, что у эндпоинтов для одного объекта.
+    outcomes — результат сервиса (True, False или None для
+    несуществующего объекта), errors — переопределённые сообщения
+    об ошибках для отдельных id.
+    """
+    errors = errors or {}
+    results = {}
+    for pk, changed in outcomes.items():
+        if pk in errors:
+            results[pk] = {
+                'status': HTTPStatus.BAD_REQUEST, 'detail': errors[pk]
+            }
+        elif changed is None:
+            results[pk] = {
+                'status': HTTPStatus.NOT_FOUND,
+                'detail': str(NotFound.default_detail)
+            }
+        elif changed:
+            results[pk] = {'status': success_status}
+        else:
+            results[pk] = {
+                'status': HTTPStatus.BAD_REQUEST, 'detail': unchanged_detail
+            }
+    return Response({'results': results}, status=HTTPStatus.OK)
@@ -0,0 +1,21 @@
+"""
+Кеши, общие для процессов.
+
+Кеш, запись в котором сбрасывает данные (версии, удаление ключа),
+корректен, только если его видят все воркеры: сброс в LocMemCache
+одного процесса не виден остальным, и они продолжают отдавать старые
+данные. Такие кеши с локальным бэкендом отключаются.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def shared_cache(alias):
+    """Кеш alias или None, если он локален для процесса."""
+    cache = caches[alias]
+    if isinstance(cache, LOCAL_BACKENDS):
+        return None
+    return cache
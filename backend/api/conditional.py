@@ -0,0 +1,44 @@
+"""
+Условные GET-запросы: ETag и Last-Modified по лёгким валидаторам,
+вычисленным без сериализации ответа.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts) -> str:
+    raw = '|'.join(map(str, parts)).encode()
+    return f'"{hashlib.md5(raw, usedforsecurity=False).hexdigest()}"'
+
+
+def timestamp(value):
+    """Метка времени в секундах для Last-Modified (None остаётся None)."""
+    return int(value.timestamp()) if value is not None else None
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """
+    Проставляет ETag и Last-Modified. Тело зависит от токена
+    пользователя, поэтому ответ варьируется по Authorization.
+    """
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def conditional_response(request, build, etag=None, last_modified=None):
+    """
+    Ответ 304, если валидаторы клиента совпали; иначе ответ функции
+    build. В обоих случаях с заголовками валидаторов.
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = build()
+    return set_validators(response, etag, last_modified)
@@ -0,0 +1,99 @@
+"""
+Денормализованные счётчики связей: рецептов автора, подписчиков,
+добавлений в избранное и в корзины.
+
+Связь (подписка, избранное, рецепт) объявляет link_counter —
+пару (поле связи, поле счётчика в связанном объекте). Увеличивают
+счётчики сервисы и админка, а уменьшает само удаление: удаление
+объекта, удаление кверисетом и каскад от удаляемого пользователя
+(обработчик pre_delete вызывает uncount). Расхождения, если они всё же
+появились, исправляет команда recount.
+"""
+from collections import Counter, defaultdict
+
+from django.db import models, router, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+def change_counter(model, pk, field, delta):
+    """
+    Атомарно сдвигает денормализованный счётчик на delta через F().
+    Счётчик не опускается ниже нуля; расхождения исправляет
+    команда recount.
+    """
+    change_counters(model, [pk], field, delta)
+
+
+def change_counters(model, pks, field, delta):
+    """То же, что change_counter, для нескольких объектов одним UPDATE."""
+    if pks:
+        model.objects.filter(pk__in=pks).update(
+            **{field: Greatest(F(field) + delta, 0)}
+        )
+
+
+def link_target(model):
+    """(модель со счётчиком, поле связи, поле счётчика) для связи."""
+    field, counter = model.link_counter
+    return model._meta.get_field(field).related_model, field, counter
+
+
+class CountedLinkQuerySet(models.QuerySet):
+    """Кверисет связей, удаление которого уменьшает счётчики."""
+
+    def _lock_targets(self):
+        """
+        {id связи: id объекта со счётчиком}. Строки блокируются до конца
+        транзакции, поэтому параллельное удаление тех же связей
+        не уменьшит счётчик второй раз.
+        """
+        _, field, _ = link_target(self.model)
+        return dict(self.select_for_update().order_by().values_list(
+            'pk', f'{field}_id'
+        ))
+
+    def _uncount(self, target_ids):
+        model, _, counter = link_target(self.model)
+        by_delta = defaultdict(list)
+        for pk, total in Counter(target_ids).items():
+            by_delta[total].append(pk)
+        for total, pks in by_delta.items():
+            change_counters(model, pks, counter, -total)
+
+    def uncount(self):
+        """
+        Уменьшает счётчики на связи кверисета, не удаляя их, — перед
+        каскадным удалением, которое обходит delete() кверисета.
+        """
+        with transaction.atomic(using=self.db, savepoint=False):
+            self._uncount(self._lock_targets().values())
+
+    def delete(self):
+        with transaction.atomic(using=self.db, savepoint=False):
+            links = self._lock_targets()
+            deleted = super(CountedLinkQuerySet, self.filter(
+                pk__in=list(links)
+            )).delete()
+            self._uncount(links.values())
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class CountedLink:
+    """Модель-связь: удаление объекта уменьшает счётчик link_counter."""
+
+    link_counter = None
+
+    def delete(self, using=None, keep_parents=False):
+        model, field, counter = link_target(type(self))
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            total, deleted = super().delete(using, keep_parents)
+            if deleted.get(self._meta.label):
+                change_counter(
+                    model, getattr(self, f'{field}_id'), counter, -1
+                )
+        return total, deleted
@@ -5,6 +5,8 @@ import uuid
 from django.core.files.base import ContentFile
 from rest_framework import serializers
 
+from .images import variant_urls
+
 
 class Base64ImageField(serializers.ImageField):
     """Позволяет принимать изображения в формате Base64."""
@@ -17,3 +19,20 @@ class Base64ImageField(serializers.ImageField):
             file_name = f"{uuid.uuid4().hex}.{ext}"
             data = ContentFile(decoded, name=file_name)
         return super().to_internal_value(data)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Отдаёт абсолютные URL производных изображений (см. api.images)."""
+    def __init__(self, variants, **kwargs):
+        self.variants = variants
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        urls = variant_urls(value, self.variants)
+        request = self.context.get('request')
+        if urls and request is not None:
+            urls = {
+                variant: request.build_absolute_uri(url)
+                for variant, url in urls.items()
+            }
+        return urls
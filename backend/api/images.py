@@ -0,0 +1,173 @@
+"""
+Производные изображения: миниатюры и WebP-варианты.
+
+Варианты лежат рядом с оригиналом в подпапке variants/ и называются
+<имя оригинала>_<вариант>.<расширение>, поэтому их URL вычисляется
+по имени файла без обращения к хранилищу. Генерация выполняется в пуле
+потоков после коммита транзакции, чтобы не задерживать запрос.
+
+Варианты публикуются, только когда записаны: после генерации в поле
+<поле картинки>_variants_for сохраняется имя оригинала. Пока оно
+не совпадает с текущей картинкой (генерация ещё идёт, упала или
+картинка загружена до появления вариантов и команда
+build_image_variants не запускалась), все варианты указывают
+на оригинал.
+"""
+import logging
+import posixpath
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+ImageVariant = namedtuple('ImageVariant', ('size', 'format'))
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': ImageVariant((480, 480), 'JPEG'),
+    'thumbnail_webp': ImageVariant((480, 480), 'WEBP'),
+    'webp': ImageVariant((1600, 1600), 'WEBP'),
+}
+
+AVATAR_VARIANTS = {
+    'thumbnail': ImageVariant((128, 128), 'JPEG'),
+    'thumbnail_webp': ImageVariant((128, 128), 'WEBP'),
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VARIANT_WORKERS,
+            thread_name_prefix='image-variants'
+        )
+    return _executor
+
+
+def variant_name(name, variant, spec):
+    """Путь файла варианта для оригинала name."""
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(
+        directory, 'variants', f'{stem}_{variant}.{EXTENSIONS[spec.format]}'
+    )
+
+
+def ready_field(field_name):
+    """Поле с именем файла, для которого построены варианты."""
+    return f'{field_name}_variants_for'
+
+
+def variant_urls(field_file, variants):
+    """Словарь {вариант: URL} для файла или None, если файла нет."""
+    if not field_file:
+        return None
+    ready = getattr(
+        field_file.instance, ready_field(field_file.field.name)
+    ) == field_file.name
+    return stored_variant_urls(
+        field_file.storage, field_file.name, variants, ready
+    )
+
+
+def stored_variant_urls(storage, name, variants, ready):
+    """
+    То же по имени файла в хранилище, без объекта FieldFile. Пока
+    варианты не построены (ready ложно), URL каждого — URL оригинала.
+    """
+    if not ready:
+        url = storage.url(name)
+        return dict.fromkeys(variants, url)
+    return {
+        variant: storage.url(variant_name(name, variant, spec))
+        for variant, spec in variants.items()
+    }
+
+
+def _render(image, spec):
+    image = image.copy()
+    image.thumbnail(spec.size, Image.LANCZOS)
+    if spec.format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(
+        buffer, spec.format, quality=settings.IMAGE_VARIANT_QUALITY,
+        optimize=True
+    )
+    return buffer.getvalue()
+
+
+def build_variants(storage, name, variants, force=False):
+    """
+    Создаёт недостающие варианты изображения name.
+    Возвращает количество созданных файлов.
+    """
+    pending = {
+        variant: spec for variant, spec in variants.items()
+        if force or not storage.exists(variant_name(name, variant, spec))
+    }
+    if not pending:
+        return 0
+    with storage.open(name, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    for variant, spec in pending.items():
+        path = variant_name(name, variant, spec)
+        if storage.exists(path):
+            storage.delete(path)
+        storage.save(path, ContentFile(_render(image, spec)))
+    return len(pending)
+
+
+def publish_variants(model, pk, field_name, name):
+    """
+    Отмечает варианты файла name построенными, если у объекта pk всё
+    ещё этот файл. Сохранение сдвигает updated_at, а сигналы post_save
+    сбрасывают кеш ответов, где варианты указывали на оригинал.
+    """
+    instance = model._default_manager.filter(
+        pk=pk, **{field_name: name}
+    ).exclude(**{ready_field(field_name): name}).first()
+    if instance is not None:
+        setattr(instance, ready_field(field_name), name)
+        instance.save(update_fields=[ready_field(field_name), 'updated_at'])
+
+
+def _build_variants_safely(model, pk, field_name, storage, name, variants):
+    close_old_connections()
+    try:
+        build_variants(storage, name, variants)
+        publish_variants(model, pk, field_name, name)
+    except Exception:
+        logger.exception('Не удалось создать варианты изображения %s', name)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(field_file, variants):
+    """Ставит генерацию вариантов в пул после коммита транзакции."""
+    if not field_file:
+        return
+    model, pk = type(field_file.instance), field_file.instance.pk
+    field_name, storage, name = (
+        field_file.field.name, field_file.storage, field_file.name
+    )
+    transaction.on_commit(lambda: get_executor().submit(
+        _build_variants_safely, model, pk, field_name, storage, name,
+        variants
+    ))
+
+
+def delete_variants(storage, name, variants):
+    for variant, spec in variants.items():
+        storage.delete(variant_name(name, variant, spec))
@@ -0,0 +1,250 @@
+"""
+Метрики запроса: число SQL-запросов, время в БД, повторяющиеся
+запросы (признак N+1) и время сериализации.
+
+RequestMetricsMiddleware кладёт метрики запроса в ContextVar, а
+execute_wrapper, который ставится на каждое подключение при его
+создании, пишет в них SQL. Контекст копируется в потоки sync_to_async,
+поэтому под ASGI учитываются и запросы асинхронного ORM. Метрики
+отдаются в заголовке Server-Timing и пишутся одной JSON-строкой
+в лог api.instrumentation.
+
+Для маршрутов из QUERY_BUDGETS (ключ — '<МЕТОД> <имя маршрута>' или
+просто имя маршрута) проверяется бюджет запросов: превышение пишется
+в лог как предупреждение, а при QUERY_BUDGET_STRICT = True (в тестах)
+запрос падает с QueryBudgetExceeded и списком выполненных SQL.
+
+query_budget(n) — то же ограничение для произвольного кода в тестах,
+как контекстный менеджер или декоратор.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ContextDecorator, ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_metrics = ContextVar('request_metrics', default=None)
+
+PLACEHOLDER_LISTS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+DUPLICATES_IN_LOG = 5
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """SQL без литералов и со свёрнутыми списками IN (%s, ...)."""
+    return LITERALS.sub('?', PLACEHOLDER_LISTS.sub('(...)', sql))
+
+
+class QueryLog:
+    """execute_wrapper, запоминающий SQL и время каждого запроса."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def install(self, stack):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    @property
+    def duration(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self):
+        """Отпечатки, выполненные больше одного раза, по убыванию."""
+        counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return [(sql, n) for sql, n in counts.most_common() if n > 1]
+
+    def report(self):
+        return '\n'.join(
+            f'{number}. {sql}'
+            for number, (sql, _) in enumerate(self.queries, 1)
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.queries(execute, sql, params, many, context)
+
+
+def install_recorder(sender, connection, **kwargs):
+    """
+    Обработчик connection_created. Обёртка ставится в начало списка:
+    контекстный менеджер execute_wrapper снимает последнюю обёртку,
+    и подключение, открытое внутри него, не должно её подменить.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = QueryLog()
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+
+class TimedSerializerMixin:
+    """
+    Учитывает время to_representation в метриках запроса. Вложенные
+    сериализаторы и элементы many=True не считаются повторно.
+    """
+
+    def to_representation(self, instance):
+        metrics = _metrics.get()
+        if metrics is None or metrics.serializer_depth:
+            return super().to_representation(instance)
+        metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializer_depth -= 1
+
+
+class query_budget(ContextDecorator):
+    """Падает с перечнем SQL, если выполнено больше limit запросов."""
+
+    def __init__(self, limit, label='block'):
+        self.limit = limit
+        self.label = label
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        self.log = QueryLog().install(self._stack)
+        return self.log
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        if exc_info[0] is None:
+            check_budget(self.log, self.limit, self.label)
+        return False
+
+
+def check_budget(log, limit, label):
+    if len(log.queries) > limit:
+        raise QueryBudgetExceeded(
+            f'{label}: {len(log.queries)} SQL-запросов при бюджете '
+            f'{limit}:\n{log.report()}'
+        )
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        total = time.perf_counter() - started
+        self._check_budget(request, metrics)
+        self._report(request, response, metrics, total)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        total = time.perf_counter() - started
+        self._check_budget(request, metrics)
+        self._report(request, response, metrics, total)
+        return response
+
+    @staticmethod
+    def _route(request):
+        match = getattr(request, 'resolver_match', None)
+        return match.url_name if match else None
+
+    def _check_budget(self, request, metrics):
+        route = self._route(request)
+        budgets = settings.QUERY_BUDGETS
+        limit = budgets.get(f'{request.method} {route}', budgets.get(route))
+        if limit is None:
+            return
+        try:
+            check_budget(
+                metrics.queries, limit, f'{request.method} {request.path}'
+            )
+        except QueryBudgetExceeded:
+            if settings.QUERY_BUDGET_STRICT:
+                raise
+            logger.warning(
+                'Превышен бюджет запросов маршрута %s', route, exc_info=True
+            )
+
+    def _report(self, request, response, metrics, total):
+        queries = metrics.queries
+        duplicates = queries.duplicates()
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = ', '.join((
+                f'db;desc="{len(queries.queries)} queries";'
+                f'dur={_ms(queries.duration)}',
+                f'dup;desc="{sum(n - 1 for _, n in duplicates)} repeated"',
+                f'serializer;dur={_ms(metrics.serializer_time)}',
+                f'total;dur={_ms(total)}',
+            ))
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'route': self._route(request),
+            'status': response.status_code,
+            'queries': len(queries.queries),
+            'db_ms': _ms(queries.duration),
+            'serializer_ms': _ms(metrics.serializer_time),
+            'total_ms': _ms(total),
+            'duplicates': [
+                {
+                    'fingerprint': hashlib.md5(
+                        sql.encode(), usedforsecurity=False
+                    ).hexdigest()[:12],
+                    'count': count,
+                    'sql': sql[:300],
+                }
+                for sql, count in duplicates[:DUPLICATES_IN_LOG]
+            ],
+        }, ensure_ascii=False))
@@ -0,0 +1,278 @@
+import asyncio
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from itertools import cycle
+from statistics import quantiles
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Ingredient, Recipe
+from recipes.shortlinks import encode_recipe_id
+
+MODES = ('wsgi', 'asgi')
+
+CONTENT_LENGTH = re.compile(rb'\r\ncontent-length:\s*(\d+)')
+
+STARTUP_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def fetch(reader, writer, request):
+    """
+    Отправляет запрос и читает ответ с Content-Length. Возвращает код
+    ответа и признак того, что сервер закрывает соединение.
+    """
+    writer.write(request)
+    await writer.drain()
+    head = (await reader.readuntil(b'\r\n\r\n')).lower()
+    length = CONTENT_LENGTH.search(head)
+    if length:
+        await reader.readexactly(int(length[1]))
+    return int(head.split(b' ', 2)[1]), b'\r\nconnection: close' in head
+
+
+class Load:
+    """Результаты прогона: задержки успешных запросов и коды ответов."""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.elapsed = 0.0
+
+    def percentile(self, value):
+        if len(self.latencies) < 2:
+            return float('nan')
+        return quantiles(self.latencies, n=100)[value - 1] * 1000
+
+
+async def client(address, requests, deadline, load):
+    """
+    Один пользователь нагрузки: запросы по кругу через keep-alive
+    соединение. Синхронный воркер gunicorn закрывает соединение после
+    ответа, тогда время нового подключения входит в задержку.
+    """
+    connection = None
+    while time.monotonic() < deadline:
+        request = next(requests)
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection(*address)
+            status, close = await fetch(*connection, request)
+        except (OSError, asyncio.IncompleteReadError):
+            load.statuses['error'] += 1
+            close = True
+        else:
+            load.latencies.append(time.perf_counter() - started)
+            load.statuses[status] += 1
+        if close and connection is not None:
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def run_load(address, requests, concurrency, duration):
+    load = Load()
+    started = time.monotonic()
+    await asyncio.gather(*(
+        client(address, requests, started + duration, load)
+        for _ in range(concurrency)
+    ))
+    load.elapsed = time.monotonic() - started
+    return load
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает синхронный (WSGI) и асинхронный (ASGI) режимы сервера '
+        'под конкурентной нагрузкой на эндпоинтах чтения: ленту и '
+        'карточки рецептов, теги, поиск ингредиентов и короткие ссылки. '
+        'Серверы gunicorn запускаются с gunicorn.conf.py на свободных '
+        'портах, если не указан --url.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes', nargs='+', choices=MODES, default=list(MODES)
+        )
+        parser.add_argument(
+            '--url', action='append', default=[], metavar='MODE=URL',
+            help='Уже запущенный сервер режима, например '
+                 'asgi=http://127.0.0.1:8000.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=64,
+            help='Число одновременных соединений.'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10.0,
+            help='Длительность замера, с.'
+        )
+        parser.add_argument(
+            '--warmup', type=float, default=2.0,
+            help='Прогрев перед замером (заполняет кеши), с.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Число воркеров gunicorn каждого режима.'
+        )
+        parser.add_argument(
+            '--token', help='Токен для запросов от имени пользователя.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        urls = {}
+        for value in options['url']:
+            mode, _, url = value.partition('=')
+            if mode not in MODES or not url:
+                raise CommandError(f'Ожидается MODE=URL: {value}')
+            urls[mode] = url
+        paths = self._paths(options['seed'])
+        self.stdout.write(
+            f'{len(paths)} адресов, {options["concurrency"]} соединений, '
+            f'{options["duration"]:.0f} с на режим.'
+        )
+        results = {}
+        for mode in options['modes']:
+            with ExitStack() as stack:
+                if mode in urls:
+                    parts = urlsplit(urls[mode])
+                    address = (parts.hostname, parts.port or 80)
+                else:
+                    address = stack.enter_context(
+                        self._server(mode, options['workers'])
+                    )
+                results[mode] = self._measure(address, paths, options)
+        self._report(results)
+
+    @staticmethod
+    def _paths(seed):
+        """Смесь запросов чтения по данным текущей БД."""
+        rng = random.Random(seed)
+        recipe_ids = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)[:200]
+        )
+        prefixes = {
+            name[:2] for name in Ingredient.objects.order_by('?').values_list(
+                'name', flat=True
+            )[:50]
+        }
+        paths = ['/api/tags/'] * 5
+        paths += [f'/api/recipes/?page={page}' for page in range(1, 11)]
+        paths += [
+            f'/api/recipes/{recipe_id}/'
+            for recipe_id in rng.sample(recipe_ids, min(len(recipe_ids), 30))
+        ]
+        paths += [
+            f'/api/ingredients/?name={quote(prefix)}' for prefix in prefixes
+        ]
+        paths += [
+            f'/s/{encode_recipe_id(recipe_id)}/'
+            for recipe_id in recipe_ids[:10]
+        ]
+        rng.shuffle(paths)
+        return paths
+
+    @contextmanager
+    def _server(self, mode, workers):
+        """Запускает gunicorn в режиме mode и ждёт, пока он ответит."""
+        port = free_port()
+        env = {
+            **os.environ,
+            'SERVER_MODE': mode,
+            'ASYNC_READ_PATH': str(mode == 'asgi'),
+            'GUNICORN_BIND': f'127.0.0.1:{port}',
+            'GUNICORN_WORKERS': str(workers),
+            'REQUEST_METRICS_LOG_LEVEL': 'WARNING',
+        }
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        address = ('127.0.0.1', port)
+        try:
+            self._wait_ready(process, address, mode)
+            yield address
+        finally:
+            process.terminate()
+            process.wait()
+
+    @staticmethod
+    def _wait_ready(process, address, mode):
+        request = (
+            f'GET /api/tags/ HTTP/1.1\r\nHost: {address[0]}\r\n'
+            f'Connection: close\r\n\r\n'
+        ).encode()
+
+        async def probe():
+            reader, writer = await asyncio.open_connection(*address)
+            try:
+                return await fetch(reader, writer, request)
+            finally:
+                writer.close()
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                break
+            try:
+                asyncio.run(probe())
+                return
+            except (OSError, asyncio.IncompleteReadError):
+                time.sleep(0.2)
+        raise CommandError(
+            f'Сервер {mode} не запустился: проверьте '
+            f'SERVER_MODE={mode} gunicorn --config gunicorn.conf.py'
+        )
+
+    @staticmethod
+    def _measure(address, paths, options):
+        headers = f'Host: {address[0]}\r\n'
+        if options['token']:
+            headers += f'Authorization: Token {options["token"]}\r\n'
+        requests = cycle([
+            f'GET {path} HTTP/1.1\r\n{headers}\r\n'.encode()
+            for path in paths
+        ])
+        if options['warmup']:
+            asyncio.run(run_load(
+                address, requests, options['concurrency'], options['warmup']
+            ))
+        return asyncio.run(run_load(
+            address, requests, options['concurrency'], options['duration']
+        ))
+
+    def _report(self, results):
+        self.stdout.write(
+            f'{"режим":<6}{"RPS":>10}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"p99, мс":>10}  коды ответов'
+        )
+        for mode, load in results.items():
+            statuses = ', '.join(
+                f'{status}: {count}'
+                for status, count in sorted(
+                    load.statuses.items(), key=lambda item: str(item[0])
+                )
+            )
+            self.stdout.write(
+                f'{mode:<6}{len(load.latencies) / load.elapsed:>10.1f}'
+                f'{load.percentile(50):>10.1f}{load.percentile(95):>10.1f}'
+                f'{load.percentile(99):>10.1f}  {statuses}'
+            )
@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from api.images import (
+    AVATAR_VARIANTS,
+    RECIPE_IMAGE_VARIANTS,
+    build_variants,
+    publish_variants,
+)
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры и WebP-варианты для уже загруженных картинок '
+        'и публикует их: до этого вместо вариантов отдаётся оригинал.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать варианты, даже если они уже есть.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=settings.IMAGE_VARIANT_WORKERS,
+            help='Количество потоков.'
+        )
+
+    def _sources(self):
+        for model, field_name, variants in (
+            (Recipe, 'image', RECIPE_IMAGE_VARIANTS),
+            (User, 'avatar', AVATAR_VARIANTS),
+        ):
+            storage = model._meta.get_field(field_name).storage
+            rows = model.objects.exclude(
+                **{field_name: ''}
+            ).exclude(
+                **{f'{field_name}__isnull': True}
+            ).values_list('pk', field_name)
+            for pk, name in rows.iterator():
+                yield model, pk, field_name, storage, name, variants
+
+    def handle(self, *args, force, workers, **options):
+        """
+        Файлы строятся в пуле потоков, а публикуются в основном потоке:
+        потоки пула не держат подключений к БД.
+        """
+        created = failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(build_variants, storage, name, variants, force):
+                (model, pk, field_name, name)
+                for model, pk, field_name, storage, name, variants
+                in self._sources()
+            }
+            for future in as_completed(futures):
+                model, pk, field_name, name = futures[future]
+                try:
+                    created += future.result()
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                else:
+                    publish_variants(model, pk, field_name, name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано вариантов: {created}, ошибок: {failed}.'
+        ))
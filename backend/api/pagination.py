@@ -1,6 +1,104 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.db import connections
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+)
+from rest_framework.response import Response
+
+
+def estimate_count(queryset):
+    """
+    Оценка количества строк по плану запроса PostgreSQL, без COUNT(*).
+    Для других СУБД оценка недоступна и возвращается None.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.explain(format='json'))
+    return plan[0]['Plan']['Plan Rows']
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Пагинация по курсору с ключом -id: страница выбирается условием
+    id < курсора вместо OFFSET, общее количество не считается.
+    Параметр ?count=exact возвращает точное количество,
+    ?count=estimate — оценку планировщика.
+    """
+    ordering = '-id'
+    page_size_query_param = 'limit'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            self.count = queryset.count()
+        elif mode == 'estimate':
+            self.count = estimate_count(queryset)
+        else:
+            self.count = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class FeedPagination(KeysetPagination):
+    """
+    Пагинация ленты подписок. Представление заранее отбирает id
+    страницы (recipes.feed) и передаёт только их, поэтому количество
+    не считается, а размер страницы ограничен.
+    """
+    max_page_size = 100
+
+    def get_cursor(self, request):
+        """Курсор запроса с числовой позицией; без курсора — начало."""
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            return Cursor(offset=0, reverse=False, position=None)
+        if cursor.position is None:
+            return cursor
+        try:
+            return cursor._replace(position=int(cursor.position))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        return CursorPagination.paginate_queryset(
+            self, queryset, request, view
+        )
 
 
 class LimitPageNumberPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с параметром limit. Если в запросе есть
+    параметр cursor (для первой страницы — пустой), используется
+    KeysetPagination.
+    """
     page_query_param = 'page'
     page_size_query_param = 'limit'
+    cursor_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,71 @@
+"""
+Рендереры API.
+
+ORJSONRenderer выдаёт те же байты, что и JSONRenderer из DRF
+с настройками UNICODE_JSON, COMPACT_JSON и STRICT_JSON по умолчанию,
+но сериализует через orjson. Значения, которых orjson не знает
+(Decimal, ленивые строки, даты в формате DRF), он передаёт JSONEncoder
+из DRF. Запрос с отступом (Accept: application/json; indent=4)
+обрабатывается родительским классом.
+"""
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+encode = JSONEncoder().default
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+)
+
+# Как и JSONRenderer, экранирует разделители строк, недопустимые
+# в JavaScript.
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        body = orjson.dumps(data, default=encode, option=ORJSON_OPTIONS)
+        for separator, escaped in LINE_SEPARATORS:
+            body = body.replace(separator, escaped)
+        return body
+
+
+class PassthroughRenderer(BaseRenderer):
+    """
+    Рендерер для вьюх, которые сами формируют тело ответа.
+    Нужен, чтобы согласование контента DRF принимало ?format=.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            # Ошибки DRF (401, 404 и т.п.) приходят словарём.
+            return '\n'.join(str(value) for value in data.values())
+        return data
+
+
+class PlainTextRenderer(PassthroughRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(PassthroughRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PrintableHTMLRenderer(PassthroughRenderer):
+    media_type = 'text/html'
+    format = 'html'
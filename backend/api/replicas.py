@@ -0,0 +1,117 @@
+"""
+Чтение с реплик БД.
+
+ReplicaMiddleware выбирает для запросов GET и HEAD одну из реплик
+DATABASE_REPLICAS, PrimaryReplicaRouter отправляет на неё чтения этого
+запроса. Запись, чтения вне HTTP-запросов (команды, фоновые задачи)
+и запросы без настроенных реплик идут в основную БД default.
+
+После запроса, меняющего данные, клиент получает cookie, и следующие
+REPLICA_STICKY_SECONDS секунд его чтения тоже идут в основную БД:
+пользователь сразу видит свои изменения, даже если реплика отстаёт.
+
+use_primary() направляет чтения блока в основную БД. Так строятся
+тела версионируемых кешей: запись после коммита сбрасывает версию,
+и тело, построенное по отстающей реплике, прожило бы весь TTL.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE = 'read_primary_until'
+
+READ_METHODS = ('GET', 'HEAD')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+@contextmanager
+def use_primary():
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def _databases():
+    return {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = _databases()
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Реплики получают схему репликацией, а не миграциями."""
+        return db == DEFAULT_DB_ALIAS
+
+
+def _is_sticky(request):
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _read_alias.set(self._read_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self._stick(request, response)
+
+    async def __acall__(self, request):
+        token = _read_alias.set(self._read_alias(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self._stick(request, response)
+
+    @staticmethod
+    def _read_alias(request):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas or request.method not in READ_METHODS
+            or _is_sticky(request)
+        ):
+            return None
+        return random.choice(replicas)
+
+    @staticmethod
+    def _stick(request, response):
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                STICKY_COOKIE, f'{time.time() + seconds:.3f}',
+                max_age=seconds, httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,115 @@
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from api.authentication import get_token_cache, token_cache_key
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.tests.factories import create_user
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+
+LOCAL_CACHE = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    for alias in ('default', 'tokens')
+}
+
+SHARED_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEMP_CACHE_DIR,
+    },
+}
+
+
+def token_queries(queries):
+    return [
+        query for query in queries.captured_queries
+        if Token._meta.db_table in query['sql']
+    ]
+
+
+class TokenCacheTestMixin:
+
+    def setUp(self):
+        self.user = create_user('user')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def me(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/users/me/')
+        return response, token_queries(queries)
+
+
+@override_settings(CACHES=LOCAL_CACHE, AUTH_TOKEN_CACHE='tokens')
+class LocalCacheTests(TokenCacheTestMixin, TestCase):
+    """Локальный кеш процесса для токенов не используется."""
+
+    def test_token_read_from_database(self):
+        self.assertIsNone(get_token_cache())
+        for _ in range(2):
+            response, queries = self.me()
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertEqual(len(queries), 1)
+
+
+@override_settings(CACHES=SHARED_CACHE, AUTH_TOKEN_CACHE='tokens')
+class SharedCacheTests(TokenCacheTestMixin, TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        get_token_cache().clear()
+
+    def test_cache_hit(self):
+        self.me()
+        response, queries = self.me()
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(queries, [])
+
+    def test_password_hash_not_cached(self):
+        self.me()
+        token = get_token_cache().get(token_cache_key(self.token.key))
+        self.assertNotIn('password', token.user.__dict__)
+        self.assertEqual(token.user.pk, self.user.pk)
+
+    def test_set_password(self):
+        self.me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/users/set_password/', {
+                'current_password': 'Pass-12345',
+                'new_password': 'Another-Pass-678',
+            })
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Another-Pass-678'))
+
+    def test_deactivation_revokes_access(self):
+        self.me()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        response, queries = self.me()
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        self.assertEqual(len(queries), 1)
+
+    def test_logout_revokes_access(self):
+        self.me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        response, _ = self.me()
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
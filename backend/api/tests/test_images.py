@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from api.images import RECIPE_IMAGE_VARIANTS, variant_name
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe
+from recipes.tests.factories import create_ingredient, create_tag, create_user
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+PNG = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+
+class ImmediateExecutor:
+    """Строит варианты сразу, в потоке и соединении теста."""
+
+    def submit(self, function, *args):
+        function(*args)
+
+
+class IdleExecutor:
+    """Пул, до которого задача ещё не дошла."""
+
+    def submit(self, function, *args):
+        pass
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('api.images.close_old_connections', mock.Mock())
+class ImageVariantsTests(APITestCase):
+    """Варианты картинки отдаются, только когда они записаны."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = create_user('author')
+        self.client.force_authenticate(self.user)
+        self.recipe_data = {
+            'ingredients': [
+                {'id': create_ingredient('соль').pk, 'amount': 1}
+            ],
+            'tags': [create_tag('lunch').pk], 'image': PNG,
+            'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 5,
+        }
+
+    def create_recipe(self, executor):
+        with mock.patch('api.images.get_executor', executor):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    '/api/recipes/', self.recipe_data, format='json'
+                )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        return Recipe.objects.get(pk=response.json()['id'])
+
+    def variants(self, recipe):
+        data = self.client.get(f'/api/recipes/{recipe.pk}/').json()
+        return data['image'], data['image_variants']
+
+    def assertFallback(self, recipe):
+        image, variants = self.variants(recipe)
+        self.assertEqual(variants, dict.fromkeys(RECIPE_IMAGE_VARIANTS, image))
+
+    def test_published_after_build(self):
+        recipe = self.create_recipe(ImmediateExecutor)
+        self.assertEqual(recipe.image_variants_for, recipe.image.name)
+        image, variants = self.variants(recipe)
+        for variant, spec in RECIPE_IMAGE_VARIANTS.items():
+            name = variant_name(recipe.image.name, variant, spec)
+            self.assertTrue(recipe.image.storage.exists(name))
+            self.assertTrue(variants[variant].endswith(name))
+
+    def test_original_until_built(self):
+        self.assertFallback(self.create_recipe(IdleExecutor))
+
+    def test_original_after_failed_build(self):
+        with mock.patch('api.images.build_variants', side_effect=OSError):
+            recipe = self.create_recipe(ImmediateExecutor)
+        self.assertEqual(recipe.image_variants_for, '')
+        self.assertFallback(recipe)
+
+    def test_replaced_image_not_published(self):
+        """Варианты старой картинки не публикуются для новой."""
+        recipe = self.create_recipe(ImmediateExecutor)
+        with mock.patch('api.images.get_executor', IdleExecutor):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(
+                    f'/api/recipes/{recipe.pk}/', self.recipe_data,
+                    format='json'
+                )
+        self.assertFallback(recipe)
+
+    def test_command_publishes_existing_images(self):
+        recipe = self.create_recipe(IdleExecutor)
+        call_command('build_image_variants', stdout=StringIO())
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants_for, recipe.image.name)
+        self.assertNotEqual(*self.variants(recipe)[1].values())
@@ -0,0 +1,224 @@
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from api.instrumentation import query_budget
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.services import add_to_cart, register_recipe
+from recipes.tests.factories import (
+    create_ingredient,
+    create_recipe,
+    create_tag,
+    create_user,
+)
+from users.services import add_subscription
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+PNG = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+PAIR = {'ids': ['{recipe}', '{own}']}
+RECIPE = {
+    'ingredients': [{'id': '{ingredient}', 'amount': 2}],
+    'tags': ['{tag}'], 'name': 'Рецепт', 'text': 'Описание',
+    'cooking_time': 5,
+}
+
+# (ключ бюджета, метод, адрес, тело, статус) в порядке выполнения.
+# {recipe} — чужой рецепт, {own} — рецепт читателя.
+ROUTES = (
+    ('GET recipes-list', 'get', '/api/recipes/', None, HTTPStatus.OK),
+    (
+        'GET recipes-detail', 'get', '/api/recipes/{recipe}/', None,
+        HTTPStatus.OK
+    ),
+    (
+        'recipes-similar', 'get', '/api/recipes/{recipe}/similar/', None,
+        HTTPStatus.OK
+    ),
+    ('recipes-feed', 'get', '/api/recipes/feed/', None, HTTPStatus.OK),
+    (
+        'recipe-get-link', 'get', '/api/recipes/{recipe}/get-link/', None,
+        HTTPStatus.OK
+    ),
+    (
+        # Нечисловой id не подходит под <int:pk> и попадает в роутер.
+        'recipes-get-link', 'get', '/api/recipes/abc/get-link/', None,
+        HTTPStatus.NOT_FOUND
+    ),
+    (
+        'recipe-favorite', 'post', '/api/recipes/{recipe}/favorite/', None,
+        HTTPStatus.CREATED
+    ),
+    (
+        'recipe-favorite', 'delete', '/api/recipes/{recipe}/favorite/', None,
+        HTTPStatus.NO_CONTENT
+    ),
+    (
+        'recipe-cart', 'post', '/api/recipes/{recipe}/shopping_cart/', None,
+        HTTPStatus.CREATED
+    ),
+    (
+        'recipes-download-shopping-cart', 'get',
+        '/api/recipes/download_shopping_cart/', None, HTTPStatus.OK
+    ),
+    (
+        'recipe-cart', 'delete', '/api/recipes/{recipe}/shopping_cart/',
+        None, HTTPStatus.NO_CONTENT
+    ),
+    (
+        'recipe-favorite-bulk', 'post', '/api/recipes/favorite/', PAIR,
+        HTTPStatus.OK
+    ),
+    (
+        'recipe-favorite-bulk', 'delete', '/api/recipes/favorite/', PAIR,
+        HTTPStatus.OK
+    ),
+    (
+        'recipe-cart-bulk', 'post', '/api/recipes/shopping_cart/', PAIR,
+        HTTPStatus.OK
+    ),
+    (
+        'recipe-cart-bulk', 'delete', '/api/recipes/shopping_cart/', PAIR,
+        HTTPStatus.OK
+    ),
+    (
+        'POST recipes-list', 'post', '/api/recipes/',
+        dict(RECIPE, image=PNG), HTTPStatus.CREATED
+    ),
+    (
+        'PATCH recipes-detail', 'patch', '/api/recipes/{own}/', RECIPE,
+        HTTPStatus.OK
+    ),
+    (
+        'DELETE recipes-detail', 'delete', '/api/recipes/{own}/', None,
+        HTTPStatus.NO_CONTENT
+    ),
+    ('tags-list', 'get', '/api/tags/', None, HTTPStatus.OK),
+    ('tags-detail', 'get', '/api/tags/{tag}/', None, HTTPStatus.OK),
+    (
+        'ingredients-list', 'get', '/api/ingredients/?name=со', None,
+        HTTPStatus.OK
+    ),
+    (
+        'ingredients-detail', 'get', '/api/ingredients/{ingredient}/', None,
+        HTTPStatus.OK
+    ),
+    ('users-list', 'get', '/api/users/', None, HTTPStatus.OK),
+    ('users-detail', 'get', '/api/users/{author}/', None, HTTPStatus.OK),
+    ('users-me', 'get', '/api/users/me/', None, HTTPStatus.OK),
+    (
+        'users-subscriptions', 'get', '/api/users/subscriptions/', None,
+        HTTPStatus.OK
+    ),
+    (
+        'users-subscribe', 'delete', '/api/users/{author}/subscribe/', None,
+        HTTPStatus.NO_CONTENT
+    ),
+    (
+        'users-subscribe', 'post', '/api/users/{author}/subscribe/', None,
+        HTTPStatus.CREATED
+    ),
+    (
+        'users-subscribe-many', 'delete', '/api/users/subscribe/',
+        {'ids': ['{author}']}, HTTPStatus.OK
+    ),
+    (
+        'users-subscribe-many', 'post', '/api/users/subscribe/',
+        {'ids': ['{author}']}, HTTPStatus.OK
+    ),
+    (
+        'users-set-avatar', 'put', '/api/users/me/avatar/', {'avatar': PNG},
+        HTTPStatus.OK
+    ),
+    (
+        'users-set-avatar', 'delete', '/api/users/me/avatar/', None,
+        HTTPStatus.NO_CONTENT
+    ),
+    (
+        'users-set-password', 'post', '/api/users/set_password/', {
+            'current_password': 'Pass-12345',
+            'new_password': 'Another-Pass-678',
+        }, HTTPStatus.NO_CONTENT
+    ),
+)
+
+# Эндпоинты, закрытые для анонимов.
+AUTHENTICATED_ONLY = frozenset((
+    'recipes-feed', 'recipes-download-shopping-cart', 'users-me',
+    'users-subscriptions',
+))
+
+
+def fill(data, ids):
+    """Заменяет в теле запроса строки вида '{recipe}' на id объектов."""
+    if isinstance(data, dict):
+        return {key: fill(value, ids) for key, value in data.items()}
+    if isinstance(data, list):
+        return [fill(value, ids) for value in data]
+    if isinstance(data, str) and data[:1] == '{' and data[-1:] == '}':
+        return ids[data[1:-1]]
+    return data
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTests(APITestCase):
+    """Маршруты из QUERY_BUDGETS укладываются в свои бюджеты."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        author = create_user('author')
+        self.user = create_user('reader')
+        tag = create_tag('breakfast')
+        ingredient = create_ingredient('соль')
+        recipes = [
+            create_recipe(owner, ingredients=(ingredient,), tags=(tag,))
+            for owner in (author, author, self.user)
+        ]
+        for recipe in recipes:
+            register_recipe(recipe)
+        add_subscription(self.user, author)
+        add_to_cart(self.user, recipes[1])
+        self.ids = {
+            'recipe': recipes[0].pk, 'own': recipes[2].pk,
+            'author': author.pk, 'tag': tag.pk, 'ingredient': ingredient.pk,
+        }
+
+    def request(self, key, method, path, data, status):
+        with self.subTest(route=key, method=method):
+            with query_budget(settings.QUERY_BUDGETS[key], key):
+                response = getattr(self.client, method)(
+                    path.format(**self.ids), fill(data, self.ids),
+                    format='json'
+                )
+            self.assertEqual(response.status_code, status)
+            self.assertEqual(
+                response.resolver_match.url_name, key.split()[-1]
+            )
+
+    def test_all_routes_covered(self):
+        self.assertEqual(
+            {key for key, *_ in ROUTES}, set(settings.QUERY_BUDGETS)
+        )
+
+    def test_authenticated(self):
+        self.client.force_authenticate(self.user)
+        for route in ROUTES:
+            self.request(*route)
+
+    def test_anonymous(self):
+        for key, method, path, data, status in ROUTES:
+            if method == 'get' and key not in AUTHENTICATED_ONLY:
+                self.request(key, method, path, data, status)
@@ -0,0 +1,159 @@
+import time
+from http import HTTPStatus
+from unittest import skipUnless
+
+from api.replicas import (
+    STICKY_COOKIE,
+    PrimaryReplicaRouter,
+    ReplicaMiddleware,
+    use_primary,
+)
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+
+REPLICA = 'replica1'
+
+HAS_REPLICA = REPLICA in settings.DATABASES
+
+LOCAL_CACHE = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    for alias in settings.CACHES
+}
+
+SIGNUP = {
+    'email': 'new@example.com',
+    'username': 'new',
+    'first_name': 'Новый',
+    'last_name': 'Пользователь',
+    'password': 'Sup3r-secret-pass',
+}
+
+
+def read_alias(request):
+    """База, в которую пойдут чтения запроса за ReplicaMiddleware."""
+    aliases = []
+
+    def view(request):
+        aliases.append(router.db_for_read(Recipe))
+        return HttpResponse()
+
+    ReplicaMiddleware(view)(request)
+    return aliases[0]
+
+
+@skipUnless(HAS_REPLICA, 'Нужна реплика replica1: задайте DB_REPLICA_HOSTS.')
+@override_settings(CACHES=LOCAL_CACHE, DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    replica1 — тестовое зеркало default (TEST MIRROR). TransactionTestCase:
+    зеркало открывает своё подключение и видит только закоммиченные данные.
+    Без реплики алиас не упоминается: раннер проверяет все базы тестов.
+    """
+    databases = (
+        {DEFAULT_DB_ALIAS, REPLICA} if HAS_REPLICA else {DEFAULT_DB_ALIAS}
+    )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.factory = RequestFactory()
+
+    def queries(self, alias):
+        return CaptureQueriesContext(connections[alias])
+
+    def test_reads_go_to_replica(self):
+        for method in ('get', 'head'):
+            with self.subTest(method=method):
+                request = getattr(self.factory, method)('/api/recipes/')
+                self.assertEqual(read_alias(request), REPLICA)
+        with self.queries(REPLICA) as replica, \
+                self.queries(DEFAULT_DB_ALIAS) as primary:
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(replica.captured_queries)
+        self.assertFalse(primary.captured_queries)
+
+    def test_outside_request_reads_primary(self):
+        self.assertEqual(router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+
+    def test_use_primary(self):
+        aliases = []
+
+        def view(request):
+            with use_primary():
+                aliases.append(router.db_for_read(Recipe))
+            aliases.append(router.db_for_read(Recipe))
+            return HttpResponse()
+
+        ReplicaMiddleware(view)(self.factory.get('/api/recipes/'))
+        self.assertEqual(aliases, [DEFAULT_DB_ALIAS, REPLICA])
+
+    def test_write_goes_to_primary_and_sticks(self):
+        with self.queries(REPLICA) as replica:
+            response = self.client.post('/api/users/', SIGNUP)
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertFalse(replica.captured_queries)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        with self.queries(REPLICA) as replica, \
+                self.queries(DEFAULT_DB_ALIAS) as primary:
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFalse(replica.captured_queries)
+        self.assertTrue(primary.captured_queries)
+
+    def test_sticky_cookie(self):
+        cases = (
+            (f'{time.time() + 60}', DEFAULT_DB_ALIAS),
+            (f'{time.time() - 60}', REPLICA),
+            ('мусор', REPLICA),
+        )
+        for value, alias in cases:
+            with self.subTest(value=value):
+                request = self.factory.get('/api/recipes/')
+                request.COOKIES[STICKY_COOKIE] = value
+                self.assertEqual(read_alias(request), alias)
+
+    def test_safe_methods_do_not_stick(self):
+        request = self.factory.options('/api/recipes/')
+        response = ReplicaMiddleware(lambda request: HttpResponse())(
+            request
+        )
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_router(self):
+        replica_router = PrimaryReplicaRouter()
+        self.assertEqual(
+            replica_router.db_for_write(Recipe), DEFAULT_DB_ALIAS
+        )
+        self.assertTrue(replica_router.allow_migrate(DEFAULT_DB_ALIAS, 'x'))
+        self.assertFalse(replica_router.allow_migrate(REPLICA, 'x'))
+        primary, replica, other = Tag(), Tag(), Tag()
+        primary._state.db = DEFAULT_DB_ALIAS
+        replica._state.db = REPLICA
+        other._state.db = 'other'
+        self.assertTrue(replica_router.allow_relation(primary, replica))
+        self.assertTrue(replica_router.allow_relation(replica, replica))
+        self.assertFalse(replica_router.allow_relation(primary, other))
+
+
+@override_settings(CACHES=LOCAL_CACHE, DATABASE_REPLICAS=[])
+class NoReplicaTests(TestCase):
+
+    def test_reads_go_to_primary(self):
+        request = RequestFactory().get('/api/recipes/')
+        self.assertEqual(read_alias(request), DEFAULT_DB_ALIAS)
+
+    def test_write_does_not_stick(self):
+        response = APIClient().post('/api/users/', SIGNUP)
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
@@ -33,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.instrumentation.RequestMetricsMiddleware',
+    'api.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +82,42 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: DB_REPLICA_HOSTS=host1,host2:5433.
+# Без реплик всё читается из default (см. api/replicas.py).
+for number, address in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1
+):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['api.replicas.PrimaryReplicaRouter']
+
+# Сколько секунд после записи чтения клиента идут в основную БД.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Кеш справочников (recipes/cache.py). Кеш ответов для анонимов, их
+# валидаторы и кеш списков покупок работают только с общим для процессов
+# бэкендом (Redis, Memcached), с LocMemCache отключены.
+CATALOGUE_CACHE = os.getenv('CATALOGUE_CACHE', 'default')
+
+CATALOGUE_CACHE_TIMEOUT = int(os.getenv('CATALOGUE_CACHE_TIMEOUT', 300))
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -113,11 +151,81 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 2))
+
+IMAGE_VARIANT_QUALITY = 80
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# wsgi — синхронные воркеры gunicorn, asgi — воркеры uvicorn
+# (см. gunicorn.conf.py).
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
+# Асинхронные представления горячих эндпоинтов чтения
+# (recipes/async_views.py); по умолчанию включены в режиме asgi.
+ASYNC_READ_PATH = os.getenv(
+    'ASYNC_READ_PATH', str(SERVER_MODE == 'asgi')
+) == 'True'
+
+# Заголовок Server-Timing раскрывает число запросов и время в БД,
+# поэтому включается явно или вместе с DEBUG.
+SERVER_TIMING = os.getenv('SERVER_TIMING', str(DEBUG)) == 'True'
+
+# Максимум SQL-запросов на маршрут: '<МЕТОД> <имя маршрута>' или имя.
+QUERY_BUDGETS = {
+    'GET recipes-list': 8,
+    'GET recipes-detail': 8,
+    'PATCH recipes-detail': 24,
+    'DELETE recipes-detail': 18,
+    'POST recipes-list': 20,
+    'recipes-get-link': 2,
+    'recipe-get-link': 2,
+    'recipes-download-shopping-cart': 2,
+    'recipes-similar': 8,
+    'recipes-feed': 8,
+    'recipe-favorite': 8,
+    'recipe-cart': 8,
+    'recipe-favorite-bulk': 6,
+    'recipe-cart-bulk': 6,
+    'tags-list': 1,
+    'tags-detail': 1,
+    'ingredients-list': 1,
+    'ingredients-detail': 1,
+    'users-list': 4,
+    'users-detail': 4,
+    'users-me': 2,
+    'users-subscriptions': 5,
+    'users-subscribe': 14,
+    'users-subscribe-many': 9,
+    'users-set-avatar': 4,
+    'users-set-password': 4,
+}
+
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False') == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.instrumentation': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_METRICS_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+# Кеш «токен → пользователь» (api/authentication.py); работает только
+# с общим для процессов бэкендом, с LocMemCache отключён.
+AUTH_TOKEN_CACHE = os.getenv('AUTH_TOKEN_CACHE', 'default')
+
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 60))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -125,6 +233,15 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.LimitPageNumberPagination',
     'PAGE_SIZE': 6,
 }
@@ -3,7 +3,12 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
-from recipes.views import shortlink_redirect
+from recipes import async_views, views
+
+shortlink_redirect = (
+    async_views.shortlink_redirect if settings.ASYNC_READ_PATH
+    else views.shortlink_redirect
+)
 
 urlpatterns = [
     path("s/<str:code>", shortlink_redirect, name="shortlink-no-slash"),
@@ -0,0 +1,16 @@
+"""
+Настройки gunicorn. Режим задаёт переменная SERVER_MODE:
+wsgi — синхронные воркеры и foodgram.wsgi, asgi — воркеры uvicorn
+и foodgram.asgi с асинхронными представлениями чтения.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'foodgram.asgi:application'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
@@ -1,9 +1,16 @@
+from api.admin import CountedLinkAdmin
 from django.contrib import admin
 
 from .models import (
     Favorite, Ingredient, Recipe,
     RecipeIngredient, ShoppingCart, Tag
 )
+from .services import (
+    delete_recipe,
+    invalidate_carts_with,
+    register_recipe,
+)
+from .similar import schedule_similar_update
 
 
 @admin.register(Tag)
@@ -27,23 +34,49 @@ class RecipeIngredientInline(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'author', 'favorites_count')
+    list_display = (
+        'id', 'name', 'author', 'favorites_count', 'in_carts_count'
+    )
     list_filter = ('tags',)
     search_fields = ('name', 'author__username', 'author__email')
     ordering = ('name',)
+    readonly_fields = ('favorites_count', 'in_carts_count')
     inlines = [RecipeIngredientInline]
 
-    def favorites_count(self, obj):
-        return obj.in_favorites.count()
+    def get_readonly_fields(self, request, obj=None):
+        """
+        Автора не меняют: рецепт остался бы в счётчике и лентах
+        подписчиков прежнего автора.
+        """
+        fields = super().get_readonly_fields(request, obj)
+        return fields if obj is None else (*fields, 'author')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            register_recipe(obj)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            invalidate_carts_with(form.instance)
+        schedule_similar_update(form.instance)
+
+    def delete_model(self, request, obj):
+        delete_recipe(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            delete_recipe(obj)
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(CountedLinkAdmin):
     list_display = ('user', 'recipe')
     ordering = ('user', 'recipe')
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(CountedLinkAdmin):
     list_display = ('user', 'recipe')
     ordering = ('user', 'recipe')
@@ -0,0 +1,253 @@
+"""
+Асинхронные представления горячих эндпоинтов чтения для режима ASGI
+(настройка ASYNC_READ_PATH): лента и карточка рецепта, теги,
+ингредиенты и короткие ссылки.
+
+Запросы к БД идут через асинхронный ORM, тела ответов берутся из тех
+же кешей, что и у синхронных представлений, и совпадают с ними.
+Промах кеша ленты и карточки, запросы с фильтрами по пользователю
+и запись передаются синхронному RecipeViewSet: фильтры, пагинация,
+права и сериализация остаются в одном месте. Он выполняется в пуле
+потоков (thread_sensitive=False), а не в единственном потоке
+для синхронного кода, иначе такие запросы воркера шли бы по одному.
+Рендеринг JSON с флагами пользователя тоже выполняется в пуле потоков.
+"""
+from functools import wraps
+
+from api.authentication import AsyncTokenAuthentication
+from api.conditional import set_validators
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response
+from rest_framework.exceptions import (
+    AuthenticationFailed,
+    MethodNotAllowed,
+    NotFound,
+)
+
+from .cache import aget_or_build, amake_key, get_cache, json_response, render
+from .ingredient_index import ingredient_index
+from .models import Ingredient, Tag
+from .response_cache import (
+    NAMESPACE,
+    adetail_validators,
+    aoverlay_user_flags,
+    is_cacheable,
+    request_key,
+)
+from .shortlinks import aresolve_code
+from .views import RecipeViewSet
+
+READ_METHODS = ('GET', 'HEAD')
+
+authentication = AsyncTokenAuthentication()
+
+arender = sync_to_async(render, thread_sensitive=False)
+
+
+def in_pool(sync_view):
+    """
+    Корутина, выполняющая sync_view в пуле потоков. Подключения к БД
+    потока пула закрываются до и после запроса, как Django делает
+    в начале и конце обычного запроса.
+    """
+    def run(request, **kwargs):
+        close_old_connections()
+        try:
+            return sync_view(request, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+recipe_list_view = RecipeViewSet.as_view(
+    {'get': 'list', 'post': 'create'}, basename='recipes', detail=False
+)
+recipe_detail_view = RecipeViewSet.as_view(
+    {
+        'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
+        'delete': 'destroy',
+    },
+    basename='recipes', detail=True
+)
+arecipe_list_view = in_pool(recipe_list_view)
+arecipe_detail_view = in_pool(recipe_detail_view)
+
+
+def error_response(exc):
+    """Ответ в формате ошибок DRF: {"detail": ...} с кодом исключения."""
+    response = HttpResponse(
+        render({'detail': exc.detail}), status=exc.status_code,
+        content_type='application/json'
+    )
+    if isinstance(exc, MethodNotAllowed):
+        response['Allow'] = ', '.join(READ_METHODS)
+    return response
+
+
+def read_only(view):
+    """
+    Отвечает 405 на методы, кроме GET и HEAD. require_safe из Django
+    4.2 не поддерживает корутины.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in READ_METHODS:
+            return error_response(MethodNotAllowed(request.method))
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+async def authenticate(request):
+    """
+    Пользователь и токен запроса. Как и Request из DRF, учитывает
+    пользователя, заданного APIClient.force_authenticate в тестах.
+    """
+    forced = getattr(request, '_force_auth_user', None)
+    if forced is not None:
+        return forced, getattr(request, '_force_auth_token', None)
+    result = await authentication.aauthenticate(request)
+    return result or (AnonymousUser(), None)
+
+
+def delegating(delegate):
+    """
+    Методы, кроме GET и HEAD, передаются delegate — синхронному
+    представлению в пуле потоков, чтение — после аутентификации
+    по токену — корутине. Найденные пользователь и токен передаются
+    DRF так же, как force_authenticate, и представление, которому
+    корутина отдаёт промах, не проверяет токен повторно.
+    Представление освобождено от CSRF, как и APIView: csrf_exempt
+    из Django 4.2 не поддерживает корутины.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in READ_METHODS:
+                return await delegate(request, **kwargs)
+            try:
+                user, token = await authenticate(request)
+            except AuthenticationFailed as exc:
+                response = error_response(exc)
+                response['WWW-Authenticate'] = (
+                    authentication.authenticate_header(request)
+                )
+                return response
+            request.user = request._force_auth_user = user
+            request._force_auth_token = token
+            return await view(request, *args, **kwargs)
+
+        wrapper.csrf_exempt = True
+        return wrapper
+
+    return decorator
+
+
+async def cached_or_delegate(request, delegate, kwargs, *key_parts):
+    """
+    Тело из кеша анонимных ответов, при авторизации — с флагами
+    пользователя. При промахе запрос обрабатывает delegate, он же
+    заполняет кеш.
+    """
+    if is_cacheable(request):
+        key = await amake_key(NAMESPACE, request_key(request, *key_parts))
+        entry = await get_cache().aget(key)
+        if entry is not None:
+            body, built_at = entry
+            if request.user.is_authenticated:
+                response = json_response(request, await arender(
+                    await aoverlay_user_flags(body, request.user)
+                ))
+            else:
+                response = json_response(
+                    request, body, last_modified=built_at
+                )
+            return set_validators(response)
+    return await delegate(request, **kwargs)
+
+
+@delegating(arecipe_list_view)
+async def recipe_list(request):
+    return await cached_or_delegate(request, arecipe_list_view, {}, 'list')
+
+
+@delegating(arecipe_detail_view)
+async def recipe_detail(request, pk):
+    """
+    Карточка рецепта: 304 и ответ из кеша отдаются корутиной,
+    несуществующий рецепт (404) — синхронным представлением.
+    Валидаторы считаются один раз: синхронное представление берёт
+    их из request.detail_validators.
+    """
+    kwargs = {'pk': pk}
+    validators = await adetail_validators(request.user, pk)
+    request.detail_validators = validators
+    if validators is None:
+        return await arecipe_detail_view(request, **kwargs)
+    response = get_conditional_response(request, **validators)
+    if response is None:
+        response = await cached_or_delegate(
+            request, arecipe_detail_view, kwargs, 'detail', pk
+        )
+    return set_validators(response, **validators)
+
+
+async def _build_detail(queryset, pk):
+    row = await queryset.filter(pk=pk).afirst()
+    return None if row is None else render(row)
+
+
+async def _catalogue_detail(request, namespace, queryset, pk):
+    body = await aget_or_build(
+        namespace, pk, lambda: _build_detail(queryset, pk)
+    )
+    if body is None:
+        return error_response(NotFound())
+    return json_response(request, body)
+
+
+@read_only
+async def tag_list(request):
+    async def build():
+        return render([
+            tag async for tag in Tag.objects.values('id', 'name', 'slug')
+        ])
+
+    return json_response(request, await aget_or_build('tags', 'list', build))
+
+
+@read_only
+async def tag_detail(request, pk):
+    return await _catalogue_detail(
+        request, 'tags', Tag.objects.values('id', 'name', 'slug'), pk
+    )
+
+
+@read_only
+async def ingredient_list(request):
+    return json_response(request, await ingredient_index.asearch_json(
+        request.GET.get('name', '')
+    ))
+
+
+@read_only
+async def ingredient_detail(request, pk):
+    return await _catalogue_detail(
+        request, 'ingredients',
+        Ingredient.objects.values('id', 'name', 'measurement_unit'), pk
+    )
+
+
+async def shortlink_redirect(request, code: str):
+    """Редирект по короткой ссылке, обычно без обращения к БД."""
+    recipe_id = await aresolve_code(code)
+    if recipe_id is None:
+        raise Http404
+    return redirect(f'/recipes/{recipe_id}/')
@@ -0,0 +1,137 @@
+"""
+Версионируемый кеш справочников (теги, ингредиенты).
+
+Записи хранятся под ключами вида catalogue:<namespace>:<version>:<key>,
+поэтому для сброса кеша достаточно увеличить версию пространства имён.
+Бэкенд выбирается настройкой CATALOGUE_CACHE: локальная память процесса
+или общий кеш Django (Redis, Memcached). Кеш ответов для анонимов
+и списков покупок работает только с общим кешем (get_shared_cache):
+с локальным сброс версии в одном воркере не виден остальным.
+"""
+import hashlib
+import time
+
+from api.caches import shared_cache
+from api.renderers import ORJSONRenderer
+from api.replicas import use_primary
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def get_cache():
+    return caches[settings.CATALOGUE_CACHE]
+
+
+def get_shared_cache():
+    """Кеш справочников или None, если он локален для процесса."""
+    return shared_cache(settings.CATALOGUE_CACHE)
+
+
+def _version_key(namespace):
+    return f'catalogue:{namespace}:version'
+
+
+def get_version(namespace) -> int:
+    """
+    Текущая версия пространства имён — время последнего сброса
+    в наносекундах: по ней строится Last-Modified. Если ключ версии
+    вытеснен из кеша, версия начинается с текущего времени, чтобы
+    не совпасть со старыми.
+    """
+    cache = get_cache()
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(namespace) -> int:
+    """Асинхронный вариант get_version."""
+    cache = get_cache()
+    key = _version_key(namespace)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(namespace):
+    """
+    Инвалидирует все записи пространства имён: версия становится
+    временем сброса и растёт, даже если часы отстали.
+    """
+    cache = get_cache()
+    key = _version_key(namespace)
+    cache.set(
+        key, max(time.time_ns(), (cache.get(key) or 0) + 1), timeout=None
+    )
+
+
+def make_key(namespace, key):
+    """Ключ записи для текущей версии пространства имён."""
+    return f'catalogue:{namespace}:{get_version(namespace)}:{key}'
+
+
+async def amake_key(namespace, key):
+    return f'catalogue:{namespace}:{await aget_version(namespace)}:{key}'
+
+
+def get_or_build(namespace, key, build) -> bytes:
+    """
+    Читает тело ответа из кеша или строит его функцией build по основной
+    БД: тело живёт до смены версии, и отставание реплики в нём
+    закрепилось бы.
+    """
+    cache = get_cache()
+    cache_key = make_key(namespace, key)
+    body = cache.get(cache_key)
+    if body is None:
+        with use_primary():
+            body = build()
+        cache.set(cache_key, body, settings.CATALOGUE_CACHE_TIMEOUT)
+    return body
+
+
+async def aget_or_build(namespace, key, build) -> bytes:
+    """
+    Асинхронный get_or_build: build — корутина, возвращающая тело
+    ответа или None, если объекта нет (None не кешируется).
+    """
+    cache = get_cache()
+    cache_key = await amake_key(namespace, key)
+    body = await cache.aget(cache_key)
+    if body is None:
+        with use_primary():
+            body = await build()
+        if body is not None:
+            await cache.aset(
+                cache_key, body, settings.CATALOGUE_CACHE_TIMEOUT
+            )
+    return body
+
+
+def render(data) -> bytes:
+    return ORJSONRenderer().render(data)
+
+
+def json_response(request, body, last_modified=None):
+    """
+    JSON-ответ с ETag и, если передана метка времени, Last-Modified;
+    при совпадении валидаторов клиента возвращает 304.
+    """
+    etag = f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -10,3 +10,19 @@ INGREDIENT_AMOUNT_MAX_ERROR = (
 )
 MIN_COOKING_TIME_ERROR = (f'Минимальное время - {MIN_COOKING_TIME} минута.')
 MAX_COOKING_TIME_ERROR = (f'Максимальное время - {MAX_COOKING_TIME} минут.')
+INGREDIENT_SEARCH_LIMIT = 50
+INGREDIENT_CACHED_PREFIX_LENGTH = 2
+INGREDIENT_INDEX_TTL = 300
+SHORT_LINK_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+SHORT_LINK_LENGTH = 6
+SHORT_LINK_MULTIPLIER = 1580030173
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24
+FEED_FANOUT_LIMIT = 10000
+FEED_BATCH_SIZE = 1000
+FEED_BACKFILL_LIMIT = 500
+SIMILAR_RECIPES_COUNT = 10
+SIMILAR_CANDIDATES = 200
+SIMILAR_MAX_POSTING = 5000
+SIMILAR_BATCH_SIZE = 1000
@@ -0,0 +1,70 @@
+"""Форматы выгрузки списка покупок. Каждый экспортёр — генератор строк."""
+import csv
+import io
+
+from django.utils.html import escape
+
+SHOPPING_LIST_TITLE = 'Список покупок'
+EMPTY_SHOPPING_LIST = 'Список пуст.'
+
+
+def export_txt(rows):
+    yield f'{SHOPPING_LIST_TITLE}: \n'
+    separator = ''
+    for name, unit, total in rows:
+        yield f'{separator}{name} ({unit}) — {total}'
+        separator = '\n'
+    if not separator:
+        yield EMPTY_SHOPPING_LIST
+
+
+def export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    # BOM, чтобы Excel распознал UTF-8.
+    writer.writerow(['﻿Ингредиент', 'Единица измерения', 'Количество'])
+    yield flush()
+    for row in rows:
+        writer.writerow(row)
+        yield flush()
+
+
+def export_html(rows):
+    yield (
+        '<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8">'
+        f'<title>{SHOPPING_LIST_TITLE}</title><style>'
+        'body{font-family:sans-serif;margin:2em}'
+        'table{border-collapse:collapse;width:100%}'
+        'td,th{border-bottom:1px solid #ccc;padding:.4em;text-align:left}'
+        'td.check{width:1.5em}'
+        '@media print{body{margin:0}}'
+        f'</style></head><body><h1>{SHOPPING_LIST_TITLE}</h1>'
+    )
+    empty = True
+    for name, unit, total in rows:
+        if empty:
+            yield (
+                '<table><tr><th></th><th>Ингредиент</th>'
+                '<th>Количество</th></tr>'
+            )
+            empty = False
+        yield (
+            f'<tr><td class="check">&#9744;</td><td>{escape(name)}</td>'
+            f'<td>{total} {escape(unit)}</td></tr>'
+        )
+    yield f'<p>{EMPTY_SHOPPING_LIST}</p>' if empty else '</table>'
+    yield '</body></html>'
+
+
+EXPORTERS = {
+    'txt': export_txt,
+    'csv': export_csv,
+    'html': export_html,
+}
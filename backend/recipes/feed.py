@@ -0,0 +1,168 @@
+"""
+Лента подписок: рецепты авторов, на которых подписан пользователь,
+от новых к старым.
+
+Рецепты обычных авторов раскладываются по лентам подписчиков после
+публикации (fan-out on write, таблица TimelineEntry): в фоне, после
+коммита, чтобы запись тысяч строк не держала транзакцию создания
+рецепта. При подписке в ленту добавляются FEED_BACKFILL_LIMIT последних
+рецептов автора, более старые — после rebuild_timelines. У авторов
+с FEED_FANOUT_LIMIT подписчиков и больше рецепты не раскладываются:
+их читает сам запрос ленты (fan-in on read) и сливает со строками
+таблицы. Так публикация популярного автора не пишет миллионы строк,
+а страница ленты стоит одинаковое число запросов по индексам на любой
+глубине (пагинация по курсору, без OFFSET).
+
+Автор, переставший быть популярным, снова раскладывает новые рецепты,
+но рецептов, опубликованных за время популярности, в лентах нет
+до запуска команды rebuild_timelines.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from users.models import Subscription
+
+from .constants import (
+    FEED_BACKFILL_LIMIT,
+    FEED_BATCH_SIZE,
+    FEED_FANOUT_LIMIT,
+)
+from .models import Recipe, TimelineEntry, User
+
+logger = logging.getLogger(__name__)
+
+REBUILD_SQL = f"""
+INSERT INTO {TimelineEntry._meta.db_table} (user_id, recipe_id, author_id)
+SELECT subscription.user_id, recipe.id, recipe.author_id
+FROM {Subscription._meta.db_table} subscription
+JOIN {User._meta.db_table} author ON author.id = subscription.author_id
+JOIN {Recipe._meta.db_table} recipe
+    ON recipe.author_id = subscription.author_id
+WHERE author.followers_count < %s
+"""
+
+_executor = None
+
+
+def get_executor():
+    """Один поток: рецепты раскладываются в порядке публикации."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='feed-fan-out'
+        )
+    return _executor
+
+
+def _create_entries(entries):
+    for start in range(0, len(entries), FEED_BATCH_SIZE):
+        TimelineEntry.objects.bulk_create(
+            entries[start:start + FEED_BATCH_SIZE], ignore_conflicts=True
+        )
+
+
+def fan_out_recipe(recipe_id, author_id):
+    """
+    Добавляет новый рецепт в ленты подписчиков автора пачками
+    по FEED_BATCH_SIZE, каждая — отдельным запросом.
+    """
+    follower_ids = Subscription.objects.filter(
+        author_id=author_id, author__followers_count__lt=FEED_FANOUT_LIMIT
+    ).order_by().values_list('user_id', flat=True)
+    _create_entries([
+        TimelineEntry(
+            user_id=user_id, recipe_id=recipe_id, author_id=author_id
+        )
+        for user_id in follower_ids
+    ])
+
+
+def _fan_out_safely(recipe_id, author_id):
+    close_old_connections()
+    try:
+        fan_out_recipe(recipe_id, author_id)
+    except Exception:
+        logger.exception(
+            'Не удалось разложить рецепт %s по лентам', recipe_id
+        )
+    finally:
+        close_old_connections()
+
+
+def schedule_fan_out(recipe: Recipe):
+    """Ставит раскладку нового рецепта по лентам в фон после коммита."""
+    recipe_id, author_id = recipe.pk, recipe.author_id
+    transaction.on_commit(lambda: get_executor().submit(
+        _fan_out_safely, recipe_id, author_id
+    ))
+
+
+def add_authors_to_timeline(user, author_ids):
+    """
+    Добавляет в ленту до FEED_BACKFILL_LIMIT последних рецептов
+    каждого автора, на которого подписался user.
+    """
+    recipes = Recipe.objects.filter(
+        author_id__in=author_ids,
+        author__followers_count__lt=FEED_FANOUT_LIMIT
+    ).annotate(position=Window(
+        RowNumber(), partition_by=F('author_id'), order_by=F('id').desc()
+    )).filter(position__lte=FEED_BACKFILL_LIMIT).order_by().values_list(
+        'id', 'author_id'
+    )
+    _create_entries([
+        TimelineEntry(user=user, recipe_id=recipe_id, author_id=author_id)
+        for recipe_id, author_id in recipes
+    ])
+
+
+def remove_authors_from_timeline(user, author_ids):
+    if author_ids:
+        TimelineEntry.objects.filter(
+            user=user, author_id__in=author_ids
+        ).delete()
+
+
+def feed_recipe_ids(user, count, position=None, reverse=False):
+    """
+    До count id рецептов ленты user после курсора position: меньше
+    position по убыванию или при reverse — больше position
+    по возрастанию. Выборка из таблицы и выборка рецептов популярных
+    авторов ограничены count, поэтому стоимость не растёт ни с числом
+    подписок, ни с глубиной страницы.
+    """
+    bound = 'gt' if reverse else 'lt'
+    sign = '' if reverse else '-'
+    entries = TimelineEntry.objects.filter(user=user)
+    if position is not None:
+        entries = entries.filter(**{f'recipe_id__{bound}': position})
+    ids = list(entries.order_by(f'{sign}recipe_id').values_list(
+        'recipe_id', flat=True
+    )[:count])
+    popular = list(Subscription.objects.filter(
+        user=user, author__followers_count__gte=FEED_FANOUT_LIMIT
+    ).values_list('author_id', flat=True))
+    if popular:
+        recipes = Recipe.objects.filter(author_id__in=popular)
+        if position is not None:
+            recipes = recipes.filter(**{f'id__{bound}': position})
+        ids += recipes.order_by(f'{sign}id').values_list(
+            'id', flat=True
+        )[:count]
+    return sorted(set(ids), reverse=not reverse)[:count]
+
+
+@transaction.atomic
+def rebuild_timelines():
+    """
+    Пересобирает таблицу лент по текущим подпискам и числу
+    подписчиков. Возвращает число записей.
+    """
+    TimelineEntry.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL, [FEED_FANOUT_LIMIT])
+    return TimelineEntry.objects.count()
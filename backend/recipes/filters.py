@@ -1,37 +1,61 @@
 import django_filters as df
+from django import forms
+from django.db.models import Exists, OuterRef
 
-from .models import Ingredient, Recipe, Tag
+from .models import Favorite, Recipe, RecipeTag, ShoppingCart
+from .search import search_recipes
+
+
+class SlugListField(forms.Field):
+    """Список слагов из повторяющегося параметра (?tags=a&tags=b)."""
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        return [slug for slug in value or () if slug]
+
+
+class SlugListFilter(df.Filter):
+    field_class = SlugListField
 
 
 class RecipeFilter(df.FilterSet):
+    """
+    Все фильтры строятся подзапросами EXISTS / NOT EXISTS, а не JOIN,
+    поэтому строки рецептов не дублируются и DISTINCT не нужен.
+    Слаги тегов не проверяются отдельным запросом: неизвестный слаг
+    просто ничего не находит.
+    Параметр search — полнотекстовый поиск по названию и описанию,
+    результаты упорядочены по релевантности.
+    """
     is_favorited = df.NumberFilter(method='filter_bool')
     is_in_shopping_cart = df.NumberFilter(method='filter_bool')
-    author = df.NumberFilter(field_name='author__id')
-    tags = df.ModelMultipleChoiceFilter(
-        field_name='tags__slug', to_field_name='slug',
-        queryset=Tag.objects.all(),
-    )
+    author = df.NumberFilter(field_name='author')
+    tags = SlugListFilter(method='filter_tags')
+    search = df.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
         fields = ('author', 'tags')
 
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef('pk'), tag__slug__in=value
+        )))
+
     def filter_bool(self, queryset, name, value):
         user = getattr(self.request, 'user', None)
         if not user or not user.is_authenticated:
             return queryset.none() if int(value) == 1 else queryset
-        if name == 'is_favorited':
-            qs = queryset.filter(in_favorites__user=user)
-        else:
-            qs = queryset.filter(in_carts__user=user)
-        if int(value) == 1:
-            return qs
-        return queryset.exclude(id__in=qs.values('id'))
-
-
-class IngredientFilter(df.FilterSet):
-    name = df.CharFilter(field_name='name', lookup_expr='istartswith')
-
-    class Meta:
-        model = Ingredient
-        fields = ['name']
+        model = Favorite if name == 'is_favorited' else ShoppingCart
+        exists = Exists(
+            model.objects.filter(user=user, recipe=OuterRef('pk'))
+        )
+        return queryset.filter(exists if int(value) == 1 else ~exists)
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return search_recipes(queryset, value)
@@ -0,0 +1,163 @@
+"""Индекс ингредиентов в памяти процесса для автодополнения по префиксу."""
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from api.replicas import use_primary
+from asgiref.sync import sync_to_async
+
+from . import constants as c
+from .cache import aget_version, get_version, render
+from .models import Ingredient
+
+WORD_SEPARATORS = re.compile(r'[\s\-,.()«»"/]+')
+
+PREFIX_END = chr(0x10FFFF)
+
+
+def _prefix_range(keys, prefix):
+    """Границы среза отсортированного списка keys с данным префиксом."""
+    return (
+        bisect_left(keys, prefix),
+        bisect_left(keys, prefix + PREFIX_END)
+    )
+
+
+class _Snapshot:
+    """Неизменяемый снимок справочника ингредиентов."""
+
+    def __init__(self, rows, generation):
+        self.generation = generation
+        self.built_at = time.monotonic()
+        self.rows = sorted(
+            rows, key=lambda row: (
+                row['name'].casefold(), row['measurement_unit'], row['id']
+            )
+        )
+        self.keys = [row['name'].casefold() for row in self.rows]
+        words = []
+        for position, key in enumerate(self.keys):
+            for word in WORD_SEPARATORS.split(key)[1:]:
+                if word:
+                    words.append((word, position))
+        words.sort()
+        self.word_keys = [word for word, _ in words]
+        self.word_positions = [position for _, position in words]
+        self.all_json = render(self.rows)
+        self.encoded = {}
+
+    def search(self, prefix, limit):
+        """
+        Позиции ингредиентов, подходящих под префикс: сначала точное
+        совпадение, затем названия, начинающиеся с префикса, затем
+        названия, в которых с префикса начинается одно из следующих слов.
+        """
+        lo, hi = _prefix_range(self.keys, prefix)
+        positions = list(range(lo, min(hi, lo + limit)))
+        if len(positions) < limit:
+            lo, hi = _prefix_range(self.word_keys, prefix)
+            word_hits = sorted({
+                position for position in self.word_positions[lo:hi]
+                if not self.keys[position].startswith(prefix)
+            })
+            positions.extend(word_hits[:limit - len(positions)])
+        return positions
+
+
+class IngredientIndex:
+    """
+    Отсортированный по названию в нижнем регистре справочник
+    ингредиентов. Строится при первом обращении в каждом процессе и
+    перестраивается, когда меняется версия пространства имён
+    'ingredients' в кеше справочников, а также не реже раза
+    в INGREDIENT_INDEX_TTL секунд на случай локального кеша,
+    не видящего изменений из других процессов.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    @staticmethod
+    def _is_fresh(snapshot, version):
+        return (
+            snapshot is not None
+            and snapshot.generation == version
+            and time.monotonic() - snapshot.built_at
+            < c.INGREDIENT_INDEX_TTL
+        )
+
+    def _get_snapshot(self):
+        version = get_version('ingredients')
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot, version):
+            return snapshot
+        with self._lock:
+            if not self._is_fresh(self._snapshot, version):
+                with use_primary():
+                    rows = list(Ingredient.objects.values(
+                        'id', 'name', 'measurement_unit'
+                    ))
+                self._snapshot = _Snapshot(rows, version)
+            return self._snapshot
+
+    async def _aget_snapshot(self):
+        """
+        Асинхронный _get_snapshot. Строки читаются асинхронным ORM,
+        сортировка снимка выполняется в пуле потоков. Одновременные
+        перестроения в разных корутинах возможны, но безвредны.
+        """
+        version = await aget_version('ingredients')
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot, version):
+            return snapshot
+        with use_primary():
+            rows = [
+                row async for row in Ingredient.objects.values(
+                    'id', 'name', 'measurement_unit'
+                )
+            ]
+        self._snapshot = await sync_to_async(
+            _Snapshot, thread_sensitive=False
+        )(rows, version)
+        return self._snapshot
+
+    def search(self, prefix, limit=c.INGREDIENT_SEARCH_LIMIT):
+        """Ингредиенты, подходящие под префикс, в порядке релевантности."""
+        snapshot = self._get_snapshot()
+        return [
+            snapshot.rows[position]
+            for position in snapshot.search(prefix.strip().casefold(), limit)
+        ]
+
+    def search_json(self, prefix) -> bytes:
+        """
+        Готовый JSON-ответ для префикса. Пустой префикс возвращает весь
+        справочник, ответы для коротких префиксов кешируются в снимке.
+        """
+        return self._search_json(self._get_snapshot(), prefix)
+
+    async def asearch_json(self, prefix) -> bytes:
+        return self._search_json(await self._aget_snapshot(), prefix)
+
+    @staticmethod
+    def _search_json(snapshot, prefix):
+        prefix = prefix.strip().casefold()
+        if not prefix:
+            return snapshot.all_json
+        cached = snapshot.encoded.get(prefix)
+        if cached is not None:
+            return cached
+        encoded = render([
+            snapshot.rows[position]
+            for position in snapshot.search(
+                prefix, c.INGREDIENT_SEARCH_LIMIT
+            )
+        ])
+        if len(prefix) <= c.INGREDIENT_CACHED_PREFIX_LENGTH:
+            snapshot.encoded[prefix] = encoded
+        return encoded
+
+
+ingredient_index = IngredientIndex()
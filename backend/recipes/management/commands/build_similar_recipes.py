@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recipes.constants import SIMILAR_BATCH_SIZE
+from recipes.similar import rebuild_similar
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает таблицу похожих рецептов по ингредиентам и тегам. '
+        'Запускается периодически: между запусками таблица обновляется '
+        'при изменении рецептов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=SIMILAR_BATCH_SIZE,
+            help=(
+                'Число рецептов, заменяемых в одной транзакции. В памяти '
+                'держатся признаки пачки и её кандидатов.'
+            )
+        )
+
+    def handle(self, *args, batch_size, **options):
+        created = rebuild_similar(batch_size)
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Похожие рецепты пересчитаны, записей: {created}.'
+            ))
@@ -0,0 +1,298 @@
+import random
+import time
+from functools import lru_cache
+from io import BytesIO
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from recipes.cache import bump_version
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription, User
+
+DEFAULT_TAGS = (
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+    ('Десерт', 'dessert'),
+    ('Выпечка', 'baking'),
+    ('Вегетарианское', 'vegetarian'),
+    ('Быстро', 'quick'),
+    ('Праздничное', 'festive'),
+)
+
+DISHES = (
+    'Суп', 'Салат', 'Запеканка', 'Рагу', 'Пирог', 'Омлет', 'Каша',
+    'Паста', 'Котлеты', 'Жаркое', 'Блины', 'Плов', 'Соус', 'Смузи',
+)
+
+WORDS = (
+    'нарезать', 'смешать', 'обжарить', 'добавить', 'посолить', 'варить',
+    'запекать', 'остудить', 'подавать', 'минут', 'на', 'среднем', 'огне',
+    'до', 'готовности', 'в', 'духовке', 'с', 'зеленью', 'слегка',
+)
+
+PASSWORD = 'synthetic-password'
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@lru_cache(maxsize=8)
+def zipf_cum_weights(count, exponent):
+    """Накопленные веса распределения Ципфа для рангов 1..count."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетический набор данных для нагрузочных замеров: '
+        'пользователей, рецепты, избранное, корзины и подписки. '
+        'Результат детерминирован значением --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Размер пачки bulk_create.'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее число избранных рецептов на пользователя.'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Среднее число рецептов в корзине пользователя.'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа для популярности.'
+        )
+        parser.add_argument(
+            '--images', type=int, default=8,
+            help='Количество картинок-заглушек, общих для всех рецептов.'
+        )
+        parser.add_argument(
+            '--prefix', default='synthetic',
+            help='Префикс имён и почты создаваемых пользователей.'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        self.zipf = options['zipf']
+        ingredient_ids = sorted(
+            Ingredient.objects.values_list('id', flat=True)
+        )
+        if not ingredient_ids:
+            raise CommandError(
+                'Справочник ингредиентов пуст: сначала импортируйте его.'
+            )
+        if User.objects.filter(
+            username__startswith=f"{options['prefix']}_"
+        ).exists():
+            raise CommandError(
+                f"Пользователи с префиксом {options['prefix']} уже есть: "
+                'укажите другой --prefix.'
+            )
+        images = self._stage('картинки', self._create_images, options)
+        user_ids = self._stage('пользователи', self._create_users, options)
+        tag_ids = self._stage('теги', self._ensure_tags)
+        recipe_ids = self._stage(
+            'рецепты', self._create_recipes, options, user_ids, images
+        )
+        self._stage(
+            'ингредиенты и теги рецептов', self._create_recipe_links,
+            recipe_ids, ingredient_ids, tag_ids
+        )
+        for model, mean in (
+            (Favorite, options['favorites']),
+            (ShoppingCart, options['carts']),
+        ):
+            self._stage(
+                model._meta.verbose_name_plural, self._create_user_links,
+                model, 'recipe', user_ids, recipe_ids, mean
+            )
+        self._stage(
+            'подписки', self._create_user_links,
+            Subscription, 'author', user_ids, user_ids,
+            options['subscriptions']
+        )
+        self._stage('счётчики', self._call, 'recount')
+        self._stage('ленты подписок', self._call, 'rebuild_timelines')
+        self._stage('похожие рецепты', self._call, 'build_similar_recipes')
+        for namespace in ('recipes', 'tags', 'ingredients'):
+            bump_version(namespace)
+        if self.verbosity:
+            self.stdout.write(self.style.SUCCESS('Набор данных создан.'))
+
+    def _stage(self, title, function, *args, **kwargs):
+        started = time.monotonic()
+        result = function(*args, **kwargs)
+        if self.verbosity:
+            self.stdout.write(
+                f'{title}: {time.monotonic() - started:.1f} с'
+            )
+        return result
+
+    def _call(self, name):
+        """Команда обслуживания с той же подробностью и выводом."""
+        call_command(
+            name, verbosity=self.verbosity,
+            stdout=self.stdout, stderr=self.stderr
+        )
+
+    def _bulk_create(self, model, objects):
+        """Создаёт объекты пачками и возвращает их id."""
+        ids = []
+        for batch in chunks(objects, self.batch_size):
+            ids.extend(obj.pk for obj in model.objects.bulk_create(batch))
+        return ids
+
+    def _popular(self, population, count):
+        """
+        count различных элементов population, выбранных с вероятностью
+        по закону Ципфа от позиции в списке.
+        """
+        count = min(count, max(len(population) // 2, 1))
+        weights = zipf_cum_weights(len(population), self.zipf)
+        chosen = set()
+        while len(chosen) < count:
+            chosen.update(self.random.choices(
+                population, cum_weights=weights, k=count - len(chosen)
+            ))
+        return chosen
+
+    def _shuffled(self, items):
+        """Порядок популярности, не совпадающий с порядком id."""
+        items = list(items)
+        self.random.shuffle(items)
+        return items
+
+    def _create_images(self, options):
+        storage = Recipe._meta.get_field('image').storage
+        names = []
+        for number in range(options['images']):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', (640, 480), color).save(buffer, 'JPEG')
+            names.append(storage.save(
+                f'recipes/images/{options["prefix"]}_{number}.jpg',
+                ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def _create_users(self, options):
+        password = make_password(PASSWORD)
+        prefix = options['prefix']
+        return self._bulk_create(User, (
+            User(
+                username=f'{prefix}_{number}',
+                email=f'{prefix}_{number}@example.com',
+                first_name='Имя', last_name=f'Фамилия {number}',
+                password=password
+            )
+            for number in range(options['users'])
+        ))
+
+    def _ensure_tags(self):
+        for name, slug in DEFAULT_TAGS:
+            Tag.objects.get_or_create(slug=slug, defaults={'name': name})
+        return sorted(Tag.objects.values_list('id', flat=True))
+
+    def _create_recipes(self, options, user_ids, images):
+        authors = self._shuffled(user_ids)
+        weights = zipf_cum_weights(len(authors), self.zipf)
+        rng = self.random
+
+        def recipes():
+            for number in range(options['recipes']):
+                yield Recipe(
+                    author_id=rng.choices(authors, cum_weights=weights)[0],
+                    name=f'{rng.choice(DISHES)} №{number}',
+                    text=' '.join(
+                        rng.choices(WORDS, k=rng.randint(10, 60))
+                    ),
+                    image=rng.choice(images) if images else '',
+                    cooking_time=rng.randint(5, 180),
+                )
+
+        return self._bulk_create(Recipe, recipes())
+
+    def _create_recipe_links(self, recipe_ids, ingredient_ids, tag_ids):
+        ingredients = self._shuffled(ingredient_ids)
+        tags = self._shuffled(tag_ids)
+        rng = self.random
+        rows = []
+        for recipe_id in recipe_ids:
+            rows.extend(
+                RecipeIngredient(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500)
+                )
+                for ingredient_id in self._popular(
+                    ingredients, rng.randint(3, 12)
+                )
+            )
+            rows.extend(
+                RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+                for tag_id in self._popular(tags, rng.randint(1, 3))
+            )
+            if len(rows) >= self.batch_size:
+                self._flush(rows)
+        self._flush(rows)
+
+    @staticmethod
+    def _flush(rows):
+        for model in (RecipeIngredient, RecipeTag):
+            model.objects.bulk_create(
+                [row for row in rows if isinstance(row, model)]
+            )
+        rows.clear()
+
+    def _create_user_links(self, model, field, user_ids, targets, mean):
+        """
+        Связи пользователей с объектами targets: число связей у
+        пользователя распределено экспоненциально со средним mean,
+        популярность объектов — по Ципфу.
+        """
+        if not mean or not targets:
+            return
+        popular = self._shuffled(targets)
+        rng = self.random
+
+        def links():
+            for user_id in user_ids:
+                count = int(rng.expovariate(1 / mean))
+                for target_id in self._popular(popular, count + 1):
+                    if field == 'author' and target_id == user_id:
+                        continue
+                    yield model(user_id=user_id, **{f'{field}_id': target_id})
+
+        for batch in chunks(links(), self.batch_size):
+            model.objects.bulk_create(batch)
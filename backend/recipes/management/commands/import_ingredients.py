@@ -0,0 +1,205 @@
+import csv
+import json
+import re
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from recipes.cache import bump_version
+from recipes.models import Ingredient
+
+HEADER = ('name', 'measurement_unit')
+
+JSON_CHUNK_SIZE = 1 << 16
+
+WHITESPACE = re.compile(r'\s*')
+
+# Пробелы по краям, двойные пробелы и пробельные символы кроме пробела:
+# такие строки import_ingredients нормализует.
+UNNORMALIZED = r'^\s|\s$|\s\s|[\t\n\r\f\v]'
+
+
+def read_csv(file):
+    """Строки (название, ед. изм.); строка заголовка пропускается."""
+    for row in csv.reader(file):
+        if row and tuple(cell.strip() for cell in row[:2]) != HEADER:
+            yield row[0], row[1] if len(row) > 1 else ''
+
+
+def ingredient_row(item):
+    """
+    (название, ед. изм.) из объекта JSON: плоского или в формате
+    dumpdata, где значения лежат в fields.
+    """
+    item = item.get('fields', item)
+    return item.get('name', ''), item.get('measurement_unit', '')
+
+
+def read_json(file):
+    """
+    Объекты массива JSON по одному: файл читается кусками
+    по JSON_CHUNK_SIZE символов, а не целиком.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    while True:
+        chunk = file.read(JSON_CHUNK_SIZE)
+        buffer, position = buffer[position:] + chunk, 0
+        while True:
+            position = WHITESPACE.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            char = buffer[position]
+            if not started:
+                if char != '[':
+                    raise ValueError('ожидается массив JSON')
+                started = True
+                position += 1
+            elif char == ',':
+                position += 1
+            elif char == ']':
+                return
+            else:
+                try:
+                    item, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    break
+                yield ingredient_row(item)
+        if not chunk:
+            raise ValueError('массив JSON оборван или некорректен')
+
+
+def read_json_lines(file):
+    for line in file:
+        if line.strip():
+            yield ingredient_row(json.loads(line))
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+    '.jsonl': read_json_lines,
+    '.ndjson': read_json_lines,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует справочник ингредиентов из CSV, JSON или JSON Lines. '
+        'Повторный запуск ничего не дублирует: существующие пары '
+        '(название, ед. изм.) пропускаются, а сохранённые с лишними '
+        'пробелами приводятся к виду из файла.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', type=Path)
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Размер пачки проверки и вставки.'
+        )
+
+    def handle(self, *args, paths, batch_size, **options):
+        for path in paths:
+            if path.suffix.lower() not in READERS:
+                raise CommandError(f'Неизвестный формат файла: {path}')
+            if not path.exists():
+                raise CommandError(f'Файл не найден: {path}')
+        self.max_name = Ingredient._meta.get_field('name').max_length
+        self.max_unit = Ingredient._meta.get_field(
+            'measurement_unit'
+        ).max_length
+        self.inserted = self.updated = self.unchanged = self.skipped = 0
+        self.seen = set()
+        with transaction.atomic():
+            self.unnormalized = self._unnormalized()
+            for path in paths:
+                with path.open(encoding='utf-8-sig', newline='') as file:
+                    rows = READERS[path.suffix.lower()](file)
+                    try:
+                        while batch := list(islice(rows, batch_size)):
+                            self._import_batch(batch)
+                    except ValueError as error:
+                        raise CommandError(f'{path}: {error}')
+        if self.inserted or self.updated:
+            bump_version('ingredients')
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Добавлено: {self.inserted}, обновлено: {self.updated}, '
+                f'без изменений: {self.unchanged}, '
+                f'пропущено: {self.skipped}.'
+            ))
+
+    @staticmethod
+    def _normalize(value):
+        return ' '.join(str(value).split())
+
+    def _unnormalized(self):
+        """
+        {нормализованная пара: id} для строк с лишними пробелами
+        (например, загруженных через loaddata). Таких строк обычно нет,
+        поэтому они ищутся одним запросом на весь импорт.
+        """
+        rows = Ingredient.objects.filter(
+            Q(name__regex=UNNORMALIZED)
+            | Q(measurement_unit__regex=UNNORMALIZED)
+        ).order_by('pk').values_list('pk', 'name', 'measurement_unit')
+        found = {}
+        for pk, name, unit in rows:
+            found.setdefault(
+                (self._normalize(name), self._normalize(unit)), pk
+            )
+        return found
+
+    def _clean(self, rows):
+        """
+        Нормализует пробелы и отбрасывает пустые, слишком длинные
+        и повторяющиеся в файлах строки.
+        """
+        keys = {}
+        for name, unit in rows:
+            key = (self._normalize(name), self._normalize(unit))
+            if (
+                not all(key) or key in self.seen
+                or len(key[0]) > self.max_name or len(key[1]) > self.max_unit
+            ):
+                self.skipped += 1
+                continue
+            self.seen.add(key)
+            keys[key] = None
+        return list(keys)
+
+    def _import_batch(self, rows):
+        """
+        Один запрос на уже существующие пары пачки и один bulk_create
+        для новых. Других полей у ингредиента нет, поэтому обновляются
+        только строки с лишними пробелами: они приводятся к паре
+        из файла вместо вставки почти дубликата.
+        """
+        keys = self._clean(rows)
+        if not keys:
+            return
+        existing = set(Ingredient.objects.filter(
+            name__in={name for name, _ in keys}
+        ).values_list('name', 'measurement_unit'))
+        missing = [key for key in keys if key not in existing]
+        renamed = {
+            key: self.unnormalized.pop(key)
+            for key in missing if key in self.unnormalized
+        }
+        Ingredient.objects.bulk_update(
+            [Ingredient(pk=pk, name=name, measurement_unit=unit)
+             for (name, unit), pk in renamed.items()],
+            ['name', 'measurement_unit']
+        )
+        new = [key for key in missing if key not in renamed]
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit=unit)
+             for name, unit in new],
+            ignore_conflicts=True
+        )
+        self.inserted += len(new)
+        self.updated += len(renamed)
+        self.unchanged += len(keys) - len(missing)
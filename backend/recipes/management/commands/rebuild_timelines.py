@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает таблицу лент подписок по текущим подпискам: '
+        'после загрузки данных в обход сервисов и для авторов, '
+        'число подписчиков которых опустилось ниже FEED_FANOUT_LIMIT.'
+    )
+
+    def handle(self, *args, **options):
+        created = rebuild_timelines()
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Ленты пересобраны, записей: {created}.'
+            ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+)
+
+
+def count_of(model, field):
+    """Подзапрос с фактическим количеством строк model на объект."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики рецептов и '
+        'пользователей и исправляет расхождения.'
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for model, counter, source, field in COUNTERS:
+            actual = count_of(source, field)
+            fixed = model.objects.exclude(
+                **{counter: actual}
+            ).update(**{counter: actual})
+            if options['verbosity']:
+                self.stdout.write(
+                    f'{model.__name__}.{counter}: исправлено {fixed}'
+                )
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
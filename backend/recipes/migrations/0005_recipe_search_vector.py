@@ -0,0 +1,39 @@
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('russian'::regconfig, coalesce(name, '')), 'A')
+    || setweight(to_tsvector('russian'::regconfig, coalesce(text, '')), 'B')
+) STORED;
+CREATE INDEX recipes_recipe_search_vector_idx
+ON recipes_recipe USING gin (search_vector);
+"""
+
+DROP_SEARCH_VECTOR_SQL = """
+DROP INDEX IF EXISTS recipes_recipe_search_vector_idx;
+ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+def add_search_vector(apps, schema_editor):
+    # В SQLite индекс FTS5 создаётся обработчиком post_migrate
+    # (recipes.search.ensure_sqlite_index).
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SEARCH_VECTOR_SQL)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_VECTOR_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, drop_search_vector),
+    ]
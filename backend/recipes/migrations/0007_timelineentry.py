@@ -0,0 +1,54 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Порог числа подписчиков на момент миграции (FEED_FANOUT_LIMIT):
+# рецепты более популярных авторов в ленты не раскладываются.
+FANOUT_LIMIT = 10000
+
+BACKFILL_SQL = """
+INSERT INTO recipes_timelineentry (user_id, recipe_id, author_id)
+SELECT subscription.user_id, recipe.id, recipe.author_id
+FROM users_subscription subscription
+JOIN users_user author ON author.id = subscription.author_id
+JOIN recipes_recipe recipe ON recipe.author_id = subscription.author_id
+WHERE author.followers_count < %s
+"""
+
+
+def backfill_timelines(apps, schema_editor):
+    schema_editor.execute(BACKFILL_SQL, (FANOUT_LIMIT,))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0006_recipe_updated_at'),
+        ('users', '0005_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'ordering': ['-recipe'],
+                'verbose_name_plural': 'Записи ленты',
+                'indexes': [models.Index(fields=['user', 'author'], name='timeline_user_author_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
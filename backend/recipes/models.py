@@ -1,6 +1,8 @@
+from api.counters import CountedLink, CountedLinkQuerySet
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Exists, OuterRef, Value
 
 from . import constants as c
 
@@ -42,9 +44,34 @@ class Ingredient(models.Model):
         return f"{self.name} ({self.measurement_unit})"
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(CountedLinkQuerySet):
+    """Кверисет рецептов с флагами состояния для пользователя."""
+
+    def with_user_flags(self, user):
+        """
+        Аннотирует is_favorited и is_in_shopping_cart подзапросами EXISTS,
+        чтобы флаги вычислялись для всей страницы одним запросом.
+        """
+        if not user or not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False)
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            )
+        )
+
+
+class Recipe(CountedLink, models.Model):
     """Модель, описывающая рецепты."""
 
+    link_counter = ('author', 'recipes_count')
+
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name='recipes', verbose_name='Автор'
@@ -53,6 +80,10 @@ class Recipe(models.Model):
     image = models.ImageField(
         upload_to='recipes/images/', verbose_name='Картинка'
     )
+    image_variants_for = models.CharField(
+        max_length=100, blank=True, editable=False,
+        verbose_name='Варианты построены для картинки'
+    )
     text = models.TextField(verbose_name='Описание')
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления (мин)',
@@ -74,6 +105,17 @@ class Recipe(models.Model):
         'Ingredient', through='RecipeIngredient',
         related_name='recipes', verbose_name='Ингредиенты'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='В списках покупок'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Изменён'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -140,9 +182,11 @@ class RecipeIngredient(models.Model):
         )
 
 
-class Favorite(models.Model):
+class Favorite(CountedLink, models.Model):
     """Модель избранное."""
 
+    link_counter = ('recipe', 'favorites_count')
+
     user = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name='favorites', verbose_name='Пользователь'
@@ -152,6 +196,8 @@ class Favorite(models.Model):
         related_name='in_favorites', verbose_name='Рецепт'
     )
 
+    objects = CountedLinkQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'recipe')
         verbose_name = 'Избранный рецепт'
@@ -162,9 +208,11 @@ class Favorite(models.Model):
         return f"{self.user.username} — {self.recipe.name}"
 
 
-class ShoppingCart(models.Model):
+class ShoppingCart(CountedLink, models.Model):
     """Модель для продуктовой корзины."""
 
+    link_counter = ('recipe', 'in_carts_count')
+
     user = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name='shopping_cart', verbose_name='Пользователь'
@@ -174,6 +222,8 @@ class ShoppingCart(models.Model):
         related_name='in_carts', verbose_name='Рецепт'
     )
 
+    objects = CountedLinkQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'recipe')
         verbose_name = 'Элемент списка покупок'
@@ -200,3 +250,76 @@ class ShortLink(models.Model):
 
     def __str__(self):
         return self.code
+
+
+class TimelineEntry(models.Model):
+    """
+    Рецепт в ленте подписчика. Строки создаются при публикации рецепта
+    и при подписке на автора (см. feed.py).
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='timeline', verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='timeline_entries', verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='+', verbose_name='Автор'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ['-recipe']
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', 'author'), name='timeline_user_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} — {self.recipe}'
+
+
+class SimilarRecipe(models.Model):
+    """
+    Похожий рецепт: сосед по ингредиентам и тегам с мерой сходства.
+    Таблицу заполняет similar.py.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='similar', verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='similar_to', verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        ordering = ['recipe', '-score']
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'), name='unique_similar_recipe'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe', '-score'), name='similar_recipe_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} — {self.similar}'
@@ -0,0 +1,198 @@
+"""
+Кеш ответов ленты и карточки рецепта для анонимных пользователей.
+
+Тела ответов лежат в пространстве имён 'recipes' кеша справочников
+(см. cache.py) под ключом из нормализованных параметров запроса.
+Любая запись рецептов, их ингредиентов и тегов, а также тегов,
+ингредиентов и отображаемых полей пользователей увеличивает версию
+пространства имён после коммита транзакции.
+
+Авторизованный пользователь получает то же тело с подставленными
+флагами is_favorited, is_in_shopping_cart и author.is_subscribed.
+Кеш заполняют только анонимные запросы, чтобы тело не зависело
+от пользователя.
+
+Кеш ответов и валидаторы карточки работают только с общим для
+процессов кешем (cache.get_shared_cache). С локальным каждый воркер
+держит свои версии: запись в одном воркере не сбрасывает тела и ETag
+остальных, и клиент получал бы старые данные или ответ 304 на них.
+
+Функции с префиксом a — асинхронные варианты для async_views.
+"""
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from api.conditional import make_etag, timestamp
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Value
+
+from .cache import (
+    aget_version,
+    bump_version,
+    get_shared_cache,
+    get_version,
+)
+from .models import Recipe
+
+NAMESPACE = 'recipes'
+
+NS_PER_SECOND = 10 ** 9
+
+FILTER_PARAMS = ('author', 'tags', 'search')
+
+PAGINATION_PARAMS = ('page', 'limit', 'cursor', 'count')
+
+# Параметры, результат которых зависит от пользователя: такие запросы
+# авторизованных пользователей не обслуживаются из кеша.
+USER_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def invalidate_recipes():
+    """Сбрасывает кеш ответов после коммита текущей транзакции."""
+    transaction.on_commit(lambda: bump_version(NAMESPACE))
+
+
+def is_cacheable(request):
+    if get_shared_cache() is None:
+        return False
+    params = request.GET
+    if 'format' in params:
+        return False
+    if request.user.is_authenticated:
+        return not any(name in params for name in USER_PARAMS)
+    return True
+
+
+def request_key(request, *parts):
+    """
+    Ключ ответа: хост (он входит в ссылки next/previous) и известные
+    параметры запроса в каноническом порядке. Неизвестные параметры
+    на ответ не влияют и отбрасываются.
+    """
+    params = request.GET
+    items = []
+    for name in sorted(FILTER_PARAMS + PAGINATION_PARAMS + USER_PARAMS):
+        values = sorted({value for value in params.getlist(name) if value})
+        items.extend((name, value) for value in values)
+    if 'cursor' in params and not params['cursor']:
+        items.append(('cursor', ''))
+    raw = '|'.join((
+        request.build_absolute_uri('/'), *map(str, parts), urlencode(items)
+    ))
+    return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def _page_recipes(data):
+    if isinstance(data, list):
+        return data
+    return data['results'] if 'results' in data else [data]
+
+
+def _flag_rows(recipes, user):
+    return Recipe.objects.filter(
+        id__in=[recipe['id'] for recipe in recipes]
+    ).with_user_flags(user).values(
+        'id', 'is_favorited', 'is_in_shopping_cart'
+    )
+
+
+def _subscribed_ids(recipes, user):
+    return user.following.filter(
+        author_id__in={recipe['author']['id'] for recipe in recipes}
+    ).values_list('author_id', flat=True)
+
+
+def _apply_flags(recipes, rows, subscribed):
+    flags = {row['id']: row for row in rows}
+    for recipe in recipes:
+        row = flags.get(recipe['id'], {})
+        recipe['is_favorited'] = row.get('is_favorited', False)
+        recipe['is_in_shopping_cart'] = row.get('is_in_shopping_cart', False)
+        recipe['author']['is_subscribed'] = (
+            recipe['author']['id'] in subscribed
+        )
+
+
+def overlay_user_flags(body, user) -> dict:
+    """
+    Подставляет в закешированное тело (страницу, список или один
+    рецепт) флаги пользователя: два запроса на всю страницу.
+    """
+    data = json.loads(body)
+    recipes = _page_recipes(data)
+    if recipes:
+        _apply_flags(
+            recipes, _flag_rows(recipes, user),
+            set(_subscribed_ids(recipes, user))
+        )
+    return data
+
+
+async def aoverlay_user_flags(body, user) -> dict:
+    data = json.loads(body)
+    recipes = _page_recipes(data)
+    if recipes:
+        _apply_flags(
+            recipes, [row async for row in _flag_rows(recipes, user)],
+            {pk async for pk in _subscribed_ids(recipes, user)}
+        )
+    return data
+
+
+def _validator_rows(user, pk):
+    recipes = Recipe.objects.filter(pk=pk).with_user_flags(user)
+    recipes = recipes.annotate(is_subscribed=Exists(
+        user.following.filter(author=OuterRef('author_id'))
+    ) if user.is_authenticated else Value(False))
+    return recipes.values(
+        'updated_at', 'author__updated_at', 'is_favorited',
+        'is_in_shopping_cart', 'is_subscribed'
+    )
+
+
+def _validators(user, pk, row, *versions):
+    if row is None:
+        return None
+    return {
+        'etag': make_etag('recipe', pk, *row.values(), *versions),
+        'last_modified': None if user.is_authenticated else max(
+            timestamp(row['updated_at']),
+            timestamp(row['author__updated_at']),
+            *(version // NS_PER_SECOND for version in versions)
+        ),
+    }
+
+
+def detail_validators(user, pk):
+    """
+    Валидаторы карточки рецепта одним запросом: время изменения
+    рецепта и автора, флаги пользователя и версии справочников
+    тегов и ингредиентов. Версия справочника — время его сброса,
+    поэтому переименование тега сдвигает и Last-Modified. Last-Modified
+    отдаётся только анонимам: флаги пользователя меняются без
+    изменения рецепта.
+    None — если рецепта нет, pk некорректен или кеш не общий.
+    """
+    if get_shared_cache() is None:
+        return None
+    try:
+        row = _validator_rows(user, pk).first()
+    except (TypeError, ValueError):
+        return None
+    return _validators(
+        user, pk, row, get_version('tags'), get_version('ingredients')
+    )
+
+
+async def adetail_validators(user, pk):
+    if get_shared_cache() is None:
+        return None
+    try:
+        row = await _validator_rows(user, pk).afirst()
+    except (TypeError, ValueError):
+        return None
+    return _validators(
+        user, pk, row,
+        await aget_version('tags'), await aget_version('ingredients')
+    )
@@ -0,0 +1,132 @@
+"""
+Полнотекстовый поиск рецептов по названию и описанию.
+
+В PostgreSQL поиск идёт по хранимому столбцу search_vector
+(GENERATED ... STORED, конфигурация russian) с GIN-индексом, который
+создаёт миграция 0005. Столбец не объявлен в модели: его значение
+вычисляет сама СУБД, Django в него не пишет.
+
+В SQLite (локальный запуск) используется внешняя таблица FTS5
+recipes_recipe_fts, синхронизируемая триггерами. Таблица и триггеры
+создаются после migrate: SQLite пересоздаёт таблицу рецептов при
+изменении схемы, и триггеры при этом теряются.
+
+Для остальных СУБД поиск сводится к icontains без ранжирования.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, Expression, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Recipe
+
+FTS_TABLE = 'recipes_recipe_fts'
+
+WORDS = re.compile(r'\w+')
+
+SQLITE_FTS_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, text, content='recipes_recipe', content_rowid='id')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT "
+    f"ON recipes_recipe BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, text) "
+    f"VALUES (new.id, new.name, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE "
+    f"ON recipes_recipe BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text) "
+    f"VALUES ('delete', old.id, old.name, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE "
+    f"ON recipes_recipe BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text) "
+    f"VALUES ('delete', old.id, old.name, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, text) "
+    f"VALUES (new.id, new.name, new.text); END",
+)
+
+
+def ensure_sqlite_index(using='default', **kwargs):
+    """
+    Обработчик post_migrate: создаёт таблицу FTS5 и триггеры, если их
+    нет, и в этом случае перестраивает индекс по текущим рецептам.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        tables = connection.introspection.table_names(cursor)
+        if Recipe._meta.db_table not in tables:
+            return
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master "
+            "WHERE type = 'trigger' AND name LIKE %s",
+            (f'{FTS_TABLE}_a_',)
+        )
+        if FTS_TABLE in tables and cursor.fetchone()[0] == 3:
+            return
+        for statement in SQLITE_FTS_SQL:
+            cursor.execute(statement)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+
+class RecipeSQL(Expression):
+    """
+    Фрагмент SQL, в котором {table} заменяется псевдонимом таблицы
+    рецептов в текущем запросе: во вложенном запросе (например,
+    pk__in=...) он отличается от имени таблицы.
+    """
+
+    def __init__(self, sql, params, output_field):
+        super().__init__(output_field=output_field)
+        self.sql = sql
+        self.params = params
+
+    def as_sql(self, compiler, connection):
+        table = compiler.quote_name_unless_alias(
+            compiler.query.get_initial_alias()
+        )
+        return self.sql.format(table=table), self.params
+
+
+def _fts5_query(query):
+    """
+    Запрос FTS5 из слов пользовательской строки: каждое слово берётся
+    в кавычки и ищется по префиксу, слова объединяются по И.
+    Операторы FTS5 из ввода пользователя не интерпретируются.
+    """
+    return ' '.join(f'"{word}"*' for word in WORDS.findall(query))
+
+
+def search_recipes(queryset, query):
+    """
+    Рецепты, подходящие под поисковую строку, отсортированные по
+    убыванию релевантности (аннотация search_rank), затем по -id.
+    Остальные условия кверисета сохраняются.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = "websearch_to_tsquery('russian', %s)"
+        return queryset.filter(RecipeSQL(
+            f'{{table}}.search_vector @@ {tsquery}', (query,),
+            output_field=BooleanField()
+        )).annotate(search_rank=RecipeSQL(
+            f'ts_rank({{table}}.search_vector, {tsquery})', (query,),
+            output_field=FloatField()
+        )).order_by('-search_rank', '-id')
+    if vendor == 'sqlite':
+        match = _fts5_query(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,)
+        )).annotate(search_rank=RecipeSQL(
+            f'(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {{table}}.id)',
+            (match,), output_field=FloatField()
+        )).order_by('-search_rank', '-id')
+    return queryset.filter(
+        Q(name__icontains=query) | Q(text__icontains=query)
+    )
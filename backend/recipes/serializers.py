@@ -1,4 +1,14 @@
-from api.fields import Base64ImageField
+from collections import defaultdict
+
+from api.fields import Base64ImageField, ImageVariantsField
+from api.images import (
+    AVATAR_VARIANTS,
+    RECIPE_IMAGE_VARIANTS,
+    stored_variant_urls,
+)
+from api.instrumentation import TimedSerializerMixin
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 
 from users.serializers import UserSerializer
@@ -6,18 +16,20 @@ from users.serializers import UserSerializer
 from . import constants as c
 from .models import (
     Ingredient, Recipe,
-    RecipeIngredient, Tag,
-    Favorite, ShoppingCart
+    RecipeIngredient, RecipeTag, Tag,
+    Favorite, ShoppingCart, User
 )
+from .services import invalidate_carts_with, register_recipe
+from .similar import schedule_similar_update
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'slug')
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit')
@@ -47,13 +59,17 @@ class IngredientAmountWriteSerializer(serializers.Serializer):
     )
 
 
-class RecipeMinifiedSerializer(serializers.ModelSerializer):
+class RecipeMinifiedSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
+    image_variants = ImageVariantsField(RECIPE_IMAGE_VARIANTS, source='image')
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
-class RecipeListSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializer(read_only=True)
     ingredients = IngredientInRecipeReadSerializer(
@@ -61,26 +77,142 @@ class RecipeListSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(RECIPE_IMAGE_VARIANTS, source='image')
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'image_variants', 'text', 'cooking_time'
         )
 
-    def _check(self, model, obj):
+    def _check(self, model, obj, flag):
+        """
+        Берёт флаг из аннотации RecipeQuerySet.with_user_flags,
+        а для неаннотированного объекта делает отдельный запрос.
+        """
+        value = getattr(obj, flag, None)
+        if value is not None:
+            return value
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
         return model.objects.filter(user=request.user, recipe=obj).exists()
 
     def get_is_favorited(self, obj):
-        return self._check(Favorite, obj)
+        return self._check(Favorite, obj, 'is_favorited')
 
     def get_is_in_shopping_cart(self, obj):
-        return self._check(ShoppingCart, obj)
+        return self._check(ShoppingCart, obj, 'is_in_shopping_cart')
+
+
+# Поля строки values() для RecipeRowSerializer. Флаги берутся из
+# аннотации RecipeQuerySet.with_user_flags.
+RECIPE_ROW_FIELDS = (
+    'id', 'name', 'image', 'image_variants_for', 'text', 'cooking_time',
+    'is_favorited', 'is_in_shopping_cart', 'author_id', 'author__email',
+    'author__username', 'author__first_name', 'author__last_name',
+    'author__avatar', 'author__avatar_variants_for',
+)
+
+
+class BaseRecipeRowSerializer(serializers.BaseSerializer):
+    """
+    Быстрый путь чтения: тот же JSON, что у RecipeListSerializer
+    с many=True, из строк values(*RECIPE_ROW_FIELDS). Теги, ингредиенты
+    и подписки загружаются плоскими строками по запросу на страницу,
+    а ответ собирается обычными словарями без объектов моделей
+    и полей DRF.
+    """
+
+    recipe_storage = Recipe._meta.get_field('image').storage
+    avatar_storage = User._meta.get_field('avatar').storage
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        ids = [row['id'] for row in rows]
+        tags, ingredients = defaultdict(list), defaultdict(list)
+        for recipe_id, *tag in RecipeTag.objects.filter(
+            recipe_id__in=ids
+        ).order_by('tag__slug').values_list(
+            'recipe_id', 'tag_id', 'tag__name', 'tag__slug'
+        ):
+            tags[recipe_id].append(dict(zip(('id', 'name', 'slug'), tag)))
+        for recipe_id, *ingredient in RecipeIngredient.objects.filter(
+            recipe_id__in=ids
+        ).order_by('id').values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'
+        ):
+            ingredients[recipe_id].append(dict(zip(
+                ('id', 'name', 'measurement_unit', 'amount'), ingredient
+            )))
+        subscribed = self._subscribed({row['author_id'] for row in rows})
+        return [
+            {
+                'id': row['id'],
+                'tags': tags[row['id']],
+                'author': {
+                    'email': row['author__email'],
+                    'id': row['author_id'],
+                    'username': row['author__username'],
+                    'first_name': row['author__first_name'],
+                    'last_name': row['author__last_name'],
+                    'is_subscribed': row['author_id'] in subscribed,
+                    'avatar': self._url(
+                        self.avatar_storage, row['author__avatar']
+                    ),
+                    'avatar_variants': self._variant_urls(
+                        self.avatar_storage, row['author__avatar'],
+                        row['author__avatar_variants_for'], AVATAR_VARIANTS
+                    ),
+                },
+                'ingredients': ingredients[row['id']],
+                'is_favorited': row['is_favorited'],
+                'is_in_shopping_cart': row['is_in_shopping_cart'],
+                'name': row['name'],
+                'image': self._url(self.recipe_storage, row['image']),
+                'image_variants': self._variant_urls(
+                    self.recipe_storage, row['image'],
+                    row['image_variants_for'], RECIPE_IMAGE_VARIANTS
+                ),
+                'text': row['text'],
+                'cooking_time': row['cooking_time'],
+            }
+            for row in rows
+        ]
+
+    def _subscribed(self, author_ids):
+        request = self.context.get('request')
+        if not request or not request.user.is_authenticated:
+            return set()
+        return set(request.user.following.filter(
+            author_id__in=author_ids
+        ).values_list('author_id', flat=True))
+
+    def _absolute(self, url):
+        request = self.context.get('request')
+        return url if request is None else request.build_absolute_uri(url)
+
+    def _url(self, storage, name):
+        """Как ImageField: абсолютный URL файла или None."""
+        return self._absolute(storage.url(name)) if name else None
+
+    def _variant_urls(self, storage, name, ready_name, variants):
+        """Как ImageVariantsField."""
+        if not name:
+            return None
+        return {
+            variant: self._absolute(url)
+            for variant, url in stored_variant_urls(
+                storage, name, variants, ready_name == name
+            ).items()
+        }
+
+
+class RecipeRowSerializer(TimedSerializerMixin, BaseRecipeRowSerializer):
+    """BaseRecipeRowSerializer с учётом времени в метриках запроса."""
 
 
 class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
@@ -151,37 +283,71 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         """
         Хелпер, который синхронизирует связи «многие-ко-многим»
         у рецепта после валидации данных.
+
+        Ингредиенты сравниваются с уже сохранёнными: новые создаются
+        через bulk_create, изменённые количества — через bulk_update,
+        удаляются только убранные строки. Существование id ингредиентов
+        уже проверено в validate(), поэтому объекты Ingredient
+        повторно не загружаются. Похожие рецепты пересчитываются в фоне
+        после коммита.
         """
-        recipe.recipe_ingredients.all().delete()
-        for item in ingredients:
-            ingredient = Ingredient.objects.get(pk=item['id'])
-            RecipeIngredient.objects.create(
-                recipe=recipe,
-                ingredient=ingredient,
-                amount=item['amount']
+        if ingredients is not None:
+            amounts = {item['id']: item['amount'] for item in ingredients}
+            existing = {
+                row.ingredient_id: row
+                for row in recipe.recipe_ingredients.all()
+            }
+            removed = existing.keys() - amounts.keys()
+            if removed:
+                recipe.recipe_ingredients.filter(
+                    ingredient_id__in=removed
+                ).delete()
+            changed = []
+            for ingredient_id, row in existing.items():
+                amount = amounts.get(ingredient_id)
+                if amount is not None and row.amount != amount:
+                    row.amount = amount
+                    changed.append(row)
+            if changed:
+                RecipeIngredient.objects.bulk_update(changed, ['amount'])
+            added = amounts.keys() - existing.keys()
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient_id=ingredient_id,
+                    amount=amounts[ingredient_id]
+                )
+                for ingredient_id in added
             )
-        recipe.tags.set(tags)
+            if existing and (removed or changed or added):
+                invalidate_carts_with(recipe)
+        if tags is not None:
+            recipe.tags.set(tags)
+        if ingredients is not None or tags is not None:
+            schedule_similar_update(recipe)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(
             author=self.context['request'].user, **validated_data
         )
+        register_recipe(recipe)
         self._save_m2m(recipe, ingredients, tags)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients', None)
         tags = validated_data.pop('tags', None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
-        if ingredients is not None:
-            self._save_m2m(instance, ingredients, tags or [])
-        elif tags is not None:
-            self._save_m2m(instance, [], tags)
+        self._save_m2m(instance, ingredients, tags)
         return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance], 'tags', 'recipe_ingredients__ingredient'
+        )
         return RecipeListSerializer(instance, context=self.context).data
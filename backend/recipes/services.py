@@ -1,38 +1,219 @@
-from django.db.models import F, Sum
+from api.counters import change_counter, change_counters
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef, Sum
 
-from .models import Recipe, RecipeIngredient
+from .cache import bump_version, get_shared_cache, make_key
+from .feed import schedule_fan_out
+from .models import Favorite, Recipe, RecipeIngredient, ShoppingCart, User
 
+SHOPPING_LIST_CHUNK_SIZE = 500
 
+INSERT_LINKS_SQL = (
+    'INSERT INTO {table} ({user}, {target}) VALUES {values} '
+    'ON CONFLICT DO NOTHING RETURNING {target}'
+)
+
+
+def _cart_namespace(user_id):
+    return f'cart-{user_id}'
+
+
+def bump_cart_version(user_id):
+    """Сбрасывает закешированный список покупок пользователя."""
+    bump_version(_cart_namespace(user_id))
+
+
+def invalidate_carts_with(recipe: Recipe):
+    """
+    Сбрасывает списки покупок всех, у кого рецепт лежит в корзине.
+    Пользователи выбираются сразу (до каскадного удаления корзин),
+    а версии сдвигаются после коммита, чтобы параллельная выгрузка
+    не закешировала старые данные под новой версией.
+    """
+    user_ids = list(ShoppingCart.objects.filter(
+        recipe=recipe
+    ).values_list('user_id', flat=True))
+    transaction.on_commit(
+        lambda: [bump_cart_version(user_id) for user_id in user_ids]
+    )
+
+
+def _linked(user, model, field, ids):
+    """
+    {id: есть ли связь пользователя} для существующих объектов из ids
+    одним запросом; несуществующих id в словаре нет.
+    """
+    target = model._meta.get_field(field).related_model
+    return dict(target.objects.filter(pk__in=ids).annotate(
+        linked=Exists(model.objects.filter(
+            user=user, **{field: OuterRef('pk')}
+        ))
+    ).values_list('pk', 'linked'))
+
+
+def _outcomes(ids, linked, changed):
+    """
+    Итог по каждому id: None — объекта нет, True — связь изменена,
+    False — менять было нечего.
+    """
+    return {pk: (pk in changed) if pk in linked else None for pk in ids}
+
+
+def _insert_links(user, model, field, ids):
+    """
+    Вставляет связи пользователя с объектами ids одним INSERT и
+    возвращает id объектов, для которых строка действительно создана.
+    Связь, которую успел создать параллельный запрос, пропускается
+    ON CONFLICT DO NOTHING и в результат не попадает.
+    """
+    if not ids:
+        return []
+    meta = model._meta
+    sql = INSERT_LINKS_SQL.format(
+        table=meta.db_table, user=meta.get_field('user').column,
+        target=meta.get_field(field).column,
+        values=', '.join(['(%s, %s)'] * len(ids))
+    )
+    with connections[router.db_for_write(model)].cursor() as cursor:
+        cursor.execute(sql, [value for pk in ids for value in (user.pk, pk)])
+        return [target_id for target_id, in cursor.fetchall()]
+
+
+@transaction.atomic
+def bulk_link(user, model, field, ids, counter):
+    """
+    Создаёт связи пользователя с объектами ids одним INSERT
+    и увеличивает счётчики counter только у созданных связей.
+    """
+    linked = _linked(user, model, field, ids)
+    created = _insert_links(
+        user, model, field, [pk for pk, exists in linked.items() if not exists]
+    )
+    change_counters(
+        model._meta.get_field(field).related_model, created, counter, 1
+    )
+    return _outcomes(ids, linked, set(created))
+
+
+@transaction.atomic
+def bulk_unlink(user, model, field, ids):
+    """
+    Удаляет связи пользователя с объектами ids одним DELETE; счётчики
+    уменьшает удаление кверисета связей.
+    """
+    linked = _linked(user, model, field, ids)
+    old = [pk for pk, exists in linked.items() if exists]
+    if old:
+        model.objects.filter(
+            user=user, **{f'{field}_id__in': old}
+        ).delete()
+    return _outcomes(ids, linked, set(old))
+
+
+@transaction.atomic
 def add_to_favorite(user, recipe: Recipe) -> bool:
     obj, created = user.favorites.get_or_create(recipe=recipe)
+    if created:
+        change_counter(Recipe, recipe.pk, 'favorites_count', 1)
     return created
 
 
+@transaction.atomic
 def remove_from_favorite(user, recipe: Recipe) -> bool:
     deleted, _ = user.favorites.filter(recipe=recipe).delete()
     return bool(deleted)
 
 
+@transaction.atomic
 def add_to_cart(user, recipe: Recipe) -> bool:
     obj, created = user.shopping_cart.get_or_create(recipe=recipe)
+    if created:
+        change_counter(Recipe, recipe.pk, 'in_carts_count', 1)
+        transaction.on_commit(lambda: bump_cart_version(user.id))
     return created
 
 
+@transaction.atomic
 def remove_from_cart(user, recipe: Recipe) -> bool:
     deleted, _ = user.shopping_cart.filter(recipe=recipe).delete()
+    if deleted:
+        transaction.on_commit(lambda: bump_cart_version(user.id))
     return bool(deleted)
 
 
+def bulk_add_to_favorite(user, ids):
+    return bulk_link(user, Favorite, 'recipe', ids, 'favorites_count')
+
+
+def bulk_remove_from_favorite(user, ids):
+    return bulk_unlink(user, Favorite, 'recipe', ids)
+
+
+def _bump_cart_if_changed(user, outcomes):
+    if any(outcomes.values()):
+        transaction.on_commit(lambda: bump_cart_version(user.id))
+    return outcomes
+
+
+def bulk_add_to_cart(user, ids):
+    return _bump_cart_if_changed(user, bulk_link(
+        user, ShoppingCart, 'recipe', ids, 'in_carts_count'
+    ))
+
+
+def bulk_remove_from_cart(user, ids):
+    return _bump_cart_if_changed(
+        user, bulk_unlink(user, ShoppingCart, 'recipe', ids)
+    )
+
+
+def register_recipe(recipe: Recipe):
+    """Учитывает новый рецепт в счётчике автора и лентах подписчиков."""
+    change_counter(User, recipe.author_id, 'recipes_count', 1)
+    schedule_fan_out(recipe)
+
+
+@transaction.atomic
+def delete_recipe(recipe: Recipe):
+    invalidate_carts_with(recipe)
+    recipe.delete()
+
+
 def aggregate_shopping_list(user):
     """Суммирует одинаковые ингредиенты (по имени и ед. изм.)
     """
-    qs = (
+    return (
         RecipeIngredient.objects
         .filter(recipe__in_carts__user=user)
-        .values(
-            name=F('ingredient__name'), unit=F('ingredient__measurement_unit')
-        )
+        .values_list('ingredient__name', 'ingredient__measurement_unit')
         .annotate(total=Sum('amount'))
-        .order_by('name')
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+    )
+
+
+def iter_shopping_list(user):
+    """
+    Отдаёт строки (название, ед. изм., количество) списка покупок.
+    Агрегат кешируется по версии корзины пользователя, если кеш общий
+    для процессов: иначе корзину, изменённую в другом воркере, выгрузил
+    бы старый список. При промахе строки читаются серверным курсором
+    и попадают в кеш после полной выборки.
+    """
+    rows = aggregate_shopping_list(user).iterator(
+        chunk_size=SHOPPING_LIST_CHUNK_SIZE
     )
-    return [f"{row['name']} ({row['unit']}) — {row['total']}" for row in qs]
+    cache = get_shared_cache()
+    if cache is None:
+        yield from rows
+        return
+    key = make_key(_cart_namespace(user.id), 'shopping-list')
+    cached = cache.get(key)
+    if cached is not None:
+        yield from cached
+        return
+    cached = []
+    for row in rows:
+        cached.append(row)
+        yield row
+    cache.set(key, cached, settings.CATALOGUE_CACHE_TIMEOUT)
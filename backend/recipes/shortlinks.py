@@ -0,0 +1,92 @@
+"""
+Короткие коды рецептов.
+
+Код — это id рецепта, перемешанный умножением на константу по модулю
+62 ** SHORT_LINK_LENGTH и записанный в base62 начиная с младшей цифры
+(старшая часть id сверх модуля дописывается в конец). Преобразование обратимо,
+поэтому коды не пересекаются и разбираются без обращения к БД.
+Старые коды из таблицы ShortLink короче и разрешаются через кеш.
+"""
+from . import constants as c
+from .cache import get_cache
+from .models import ShortLink
+
+BASE = len(c.SHORT_LINK_ALPHABET)
+MODULUS = BASE ** c.SHORT_LINK_LENGTH
+INVERSE = pow(c.SHORT_LINK_MULTIPLIER, -1, MODULUS)
+DIGITS = {char: value for value, char in enumerate(c.SHORT_LINK_ALPHABET)}
+
+
+def _to_base62(number: int, width: int) -> str:
+    """Цифры base62 от младшей к старшей, не меньше width символов."""
+    chars = []
+    while number or len(chars) < width:
+        number, digit = divmod(number, BASE)
+        chars.append(c.SHORT_LINK_ALPHABET[digit])
+    return ''.join(chars)
+
+
+def _from_base62(chars: str) -> int:
+    number = 0
+    for char in reversed(chars):
+        number = number * BASE + DIGITS[char]
+    return number
+
+
+def encode_recipe_id(recipe_id: int) -> str:
+    high, low = divmod(recipe_id, MODULUS)
+    code = _to_base62(
+        low * c.SHORT_LINK_MULTIPLIER % MODULUS, c.SHORT_LINK_LENGTH
+    )
+    return code + _to_base62(high, 0) if high else code
+
+
+def decode_code(code: str):
+    """Id рецепта по коду или None, если код не в новом формате."""
+    if len(code) < c.SHORT_LINK_LENGTH or not all(
+        char in DIGITS for char in code
+    ):
+        return None
+    low = _from_base62(code[:c.SHORT_LINK_LENGTH]) * INVERSE % MODULUS
+    return _from_base62(code[c.SHORT_LINK_LENGTH:]) * MODULUS + low
+
+
+def _legacy_recipe_ids(code: str):
+    return ShortLink.objects.filter(code=code).values_list(
+        'recipe_id', flat=True
+    )
+
+
+def resolve_legacy_code(code: str):
+    """
+    Id рецепта для кода из таблицы ShortLink. Промахи тоже кешируются,
+    чтобы перебор случайных кодов не доходил до БД.
+    """
+    recipe_id = get_cache().get_or_set(
+        f'shortlink:{code}',
+        lambda: _legacy_recipe_ids(code).first() or 0,
+        c.SHORT_LINK_CACHE_TIMEOUT
+    )
+    return recipe_id or None
+
+
+async def aresolve_legacy_code(code: str):
+    cache = get_cache()
+    key = f'shortlink:{code}'
+    recipe_id = await cache.aget(key)
+    if recipe_id is None:
+        recipe_id = await _legacy_recipe_ids(code).afirst() or 0
+        await cache.aset(key, recipe_id, c.SHORT_LINK_CACHE_TIMEOUT)
+    return recipe_id or None
+
+
+def resolve_code(code: str):
+    recipe_id = decode_code(code)
+    return recipe_id if recipe_id is not None else resolve_legacy_code(code)
+
+
+async def aresolve_code(code: str):
+    recipe_id = decode_code(code)
+    if recipe_id is not None:
+        return recipe_id
+    return await aresolve_legacy_code(code)
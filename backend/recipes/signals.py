@@ -0,0 +1,66 @@
+from api.images import (
+    RECIPE_IMAGE_VARIANTS,
+    delete_variants,
+    schedule_variants,
+)
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django_cleanup.signals import cleanup_post_delete
+
+from .cache import bump_version
+from .models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    Tag,
+    User,
+)
+from .response_cache import invalidate_recipes
+
+# Поля пользователя, которые выводятся в карточке рецепта.
+AUTHOR_FIELDS = frozenset((
+    'email', 'username', 'first_name', 'last_name', 'avatar',
+    'avatar_variants_for'
+))
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tags(**kwargs):
+    bump_version('tags')
+    invalidate_recipes()
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredients(**kwargs):
+    """Сбрасывает кеш ингредиентов и индекс автодополнения."""
+    bump_version('ingredients')
+    invalidate_recipes()
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+@receiver([post_save, post_delete], sender=RecipeTag)
+@receiver(m2m_changed, sender=RecipeTag)
+def invalidate_recipe_responses(**kwargs):
+    invalidate_recipes()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_author_responses(update_fields=None, **kwargs):
+    """Служебные записи вроде last_login кеш ответов не сбрасывают."""
+    if update_fields is None or AUTHOR_FIELDS & set(update_fields):
+        invalidate_recipes()
+
+
+@receiver(post_save, sender=Recipe)
+def build_recipe_image_variants(instance, update_fields=None, **kwargs):
+    if update_fields is None or 'image' in update_fields:
+        schedule_variants(instance.image, RECIPE_IMAGE_VARIANTS)
+
+
+@receiver(cleanup_post_delete, sender=Recipe)
+def delete_recipe_image_variants(file, file_name, success, **kwargs):
+    """Удаляет варианты вместе с заменённой или удалённой картинкой."""
+    if success:
+        delete_variants(file.storage, file_name, RECIPE_IMAGE_VARIANTS)
@@ -0,0 +1,253 @@
+"""
+Похожие рецепты: ближайшие соседи по мере Жаккара на объединённом
+множестве ингредиентов и тегов рецепта.
+
+Число общих ингредиентов с остальными рецептами считает БД
+(соединение RecipeIngredient с самой собой по ингредиенту), и мера
+Жаккара считается только для SIMILAR_CANDIDATES рецептов с наибольшим
+пересечением. Ингредиенты, которые встречаются больше чем
+в SIMILAR_MAX_POSTING рецептах (соль, вода), и теги кандидатов
+не порождают — они сделали бы работу квадратичной, — но в мере
+сходства учитываются.
+
+Таблицу SimilarRecipe целиком пересчитывает команда
+build_similar_recipes, её стоит запускать периодически. Рецепты
+обрабатываются пачками, и в памяти держатся признаки пачки и её
+кандидатов, а не всего каталога. После изменения рецепта его соседи
+пересчитываются в фоне, а сам рецепт попадает в списки соседей,
+у которых он сильнее последнего.
+"""
+import logging
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Q
+
+from .constants import (
+    SIMILAR_BATCH_SIZE,
+    SIMILAR_CANDIDATES,
+    SIMILAR_MAX_POSTING,
+    SIMILAR_RECIPES_COUNT,
+)
+from .models import Recipe, RecipeIngredient, RecipeTag, SimilarRecipe
+from .response_cache import invalidate_recipes
+
+logger = logging.getLogger(__name__)
+
+Features = namedtuple('Features', ('ingredients', 'tags'))
+
+_executor = None
+
+
+def get_executor():
+    """Один поток: обновления соседей не пересекаются друг с другом."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='similar-recipes'
+        )
+    return _executor
+
+
+def load_features(recipe_ids):
+    """{id рецепта: Features} для рецептов recipe_ids."""
+    recipe_ids = list(recipe_ids)
+    ingredients, tags = defaultdict(set), defaultdict(set)
+    for start in range(0, len(recipe_ids), SIMILAR_BATCH_SIZE):
+        chunk = recipe_ids[start:start + SIMILAR_BATCH_SIZE]
+        for model, field, sets in (
+            (RecipeIngredient, 'ingredient_id', ingredients),
+            (RecipeTag, 'tag_id', tags),
+        ):
+            for recipe_id, value in model.objects.filter(
+                recipe_id__in=chunk
+            ).order_by().values_list('recipe_id', field):
+                sets[recipe_id].add(value)
+    return {
+        recipe_id: Features(
+            frozenset(ingredients[recipe_id]), frozenset(tags[recipe_id])
+        )
+        for recipe_id in ingredients.keys() | tags.keys()
+    }
+
+
+def jaccard(first: Features, second: Features) -> float:
+    shared = (
+        len(first.ingredients & second.ingredients)
+        + len(first.tags & second.tags)
+    )
+    total = (
+        len(first.ingredients) + len(first.tags)
+        + len(second.ingredients) + len(second.tags) - shared
+    )
+    return shared / total if total else 0.0
+
+
+def score(recipe_id, features, candidates):
+    """Пары (сходство, id) рецепта с кандидатами, по убыванию."""
+    own = features[recipe_id]
+    return sorted(
+        (
+            (jaccard(own, features[candidate]), candidate)
+            for candidate in candidates
+            if candidate != recipe_id and candidate in features
+        ),
+        reverse=True
+    )
+
+
+def _frequent_ingredients(recipe_ids):
+    """
+    Ингредиенты рецептов recipe_ids, которые встречаются больше
+    чем в SIMILAR_MAX_POSTING рецептах.
+    """
+    return RecipeIngredient.objects.filter(
+        ingredient_id__in=RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values('ingredient_id')
+    ).order_by().values('ingredient_id').annotate(
+        recipes=Count('id')
+    ).filter(recipes__gt=SIMILAR_MAX_POSTING).values('ingredient_id')
+
+
+def find_candidates(recipe_ids):
+    """
+    {id рецепта: до SIMILAR_CANDIDATES рецептов с наибольшим числом
+    общих нечастых ингредиентов}. Пересечения считает БД, строки
+    читаются потоком.
+    """
+    rows = RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).exclude(
+        ingredient_id__in=_frequent_ingredients(recipe_ids)
+    ).order_by().values(
+        'recipe_id',
+        similar_id=F('ingredient__ingredient_in_recipes__recipe_id')
+    ).annotate(shared=Count('id')).order_by(
+        'recipe_id', '-shared', 'similar_id'
+    ).values_list('recipe_id', 'similar_id')
+    candidates = defaultdict(list)
+    for recipe_id, similar_id in rows.iterator(
+        chunk_size=SIMILAR_BATCH_SIZE * 10
+    ):
+        own = candidates[recipe_id]
+        if similar_id != recipe_id and len(own) < SIMILAR_CANDIDATES:
+            own.append(similar_id)
+    return candidates
+
+
+def _rows(recipe_id, neighbours):
+    return [
+        SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id, score=value)
+        for value, similar_id in neighbours
+    ]
+
+
+def _recipe_batches(batch_size):
+    """id рецептов пачками по batch_size, по возрастанию."""
+    last = 0
+    while True:
+        batch = list(Recipe.objects.filter(id__gt=last).order_by(
+            'id'
+        ).values_list('id', flat=True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+
+def _batch_rows(batch):
+    candidates = find_candidates(batch)
+    features = load_features(
+        {*batch, *chain.from_iterable(candidates.values())}
+    )
+    return [
+        row for recipe_id in batch if recipe_id in features
+        for row in _rows(recipe_id, score(
+            recipe_id, features, candidates[recipe_id]
+        )[:SIMILAR_RECIPES_COUNT])
+    ]
+
+
+def rebuild_similar(batch_size=SIMILAR_BATCH_SIZE):
+    """
+    Пересчитывает соседей всех рецептов пачками по batch_size: каждая
+    пачка заменяется в своей транзакции. Возвращает число записей.
+    """
+    created = 0
+    for batch in _recipe_batches(batch_size):
+        rows = _batch_rows(batch)
+        with transaction.atomic():
+            SimilarRecipe.objects.filter(recipe_id__in=batch).delete()
+            SimilarRecipe.objects.bulk_create(rows)
+        created += len(rows)
+    invalidate_recipes()
+    return created
+
+
+def _insert_into_neighbours(recipe_id, scored):
+    """
+    Добавляет рецепт в списки кандидатов, где он сильнее последнего
+    соседа или список неполон; вытесненный последний сосед удаляется.
+    """
+    scores = {candidate: value for value, candidate in scored}
+    lists = defaultdict(list)
+    for pk, candidate, value in SimilarRecipe.objects.filter(
+        recipe_id__in=scores
+    ).order_by().values_list('id', 'recipe_id', 'score'):
+        lists[candidate].append((value, pk))
+    rows, evicted = [], []
+    for candidate, value in scores.items():
+        current = sorted(lists[candidate])
+        excess = len(current) + 1 - SIMILAR_RECIPES_COUNT
+        if excess <= 0 or value > current[0][0]:
+            rows.append((candidate, value))
+            evicted.extend(pk for _, pk in current[:max(excess, 0)])
+    SimilarRecipe.objects.filter(pk__in=evicted).delete()
+    SimilarRecipe.objects.bulk_create([
+        SimilarRecipe(recipe_id=candidate, similar_id=recipe_id, score=value)
+        for candidate, value in rows
+    ])
+
+
+@transaction.atomic
+def update_similar(recipe_id):
+    """
+    Пересчитывает соседей рецепта и его место в списках соседей.
+    Рецепт, который вытеснили из чужого списка, вернётся туда при
+    следующем полном пересчёте.
+    """
+    SimilarRecipe.objects.filter(
+        Q(recipe_id=recipe_id) | Q(similar_id=recipe_id)
+    ).delete()
+    candidates = find_candidates([recipe_id])[recipe_id]
+    features = load_features([recipe_id, *candidates])
+    if recipe_id in features:
+        scored = score(recipe_id, features, candidates)
+        SimilarRecipe.objects.bulk_create(
+            _rows(recipe_id, scored[:SIMILAR_RECIPES_COUNT])
+        )
+        _insert_into_neighbours(recipe_id, scored)
+    invalidate_recipes()
+
+
+def _update_similar_safely(recipe_id):
+    close_old_connections()
+    try:
+        update_similar(recipe_id)
+    except Exception:
+        logger.exception(
+            'Не удалось обновить похожие рецепты для %s', recipe_id
+        )
+    finally:
+        close_old_connections()
+
+
+def schedule_similar_update(recipe: Recipe):
+    """Ставит пересчёт соседей рецепта в фон после коммита."""
+    recipe_id = recipe.pk
+    transaction.on_commit(lambda: get_executor().submit(
+        _update_similar_safely, recipe_id
+    ))
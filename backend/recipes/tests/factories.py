@@ -0,0 +1,33 @@
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+
+def create_user(username, **fields):
+    fields.setdefault('email', f'{username}@example.com')
+    fields.setdefault('first_name', username)
+    fields.setdefault('last_name', username)
+    return User.objects.create_user(
+        username=username, password='Pass-12345', **fields
+    )
+
+
+def create_tag(slug):
+    return Tag.objects.create(name=slug, slug=slug)
+
+
+def create_ingredient(name, unit='г'):
+    return Ingredient.objects.create(name=name, measurement_unit=unit)
+
+
+def create_recipe(author, name='Рецепт', ingredients=(), tags=(), **fields):
+    """Рецепт с ингредиентами (по 1 единице) и тегами."""
+    fields.setdefault('image', 'recipes/images/recipe.png')
+    fields.setdefault('text', 'Описание')
+    fields.setdefault('cooking_time', 10)
+    recipe = Recipe.objects.create(author=author, name=name, **fields)
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for ingredient in ingredients
+    ])
+    recipe.tags.set(tags)
+    return recipe
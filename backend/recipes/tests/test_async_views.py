@@ -0,0 +1,130 @@
+import shutil
+import tempfile
+import threading
+from http import HTTPStatus
+from unittest import mock
+
+from api.instrumentation import RequestMetricsMiddleware
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.test import TransactionTestCase, override_settings
+from django.urls import include, path
+from rest_framework.authtoken.models import Token
+
+from recipes import async_views
+from recipes.views import RecipeViewSet
+
+from .factories import (
+    create_ingredient,
+    create_recipe,
+    create_tag,
+    create_user,
+)
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+
+# Адреса режима ASYNC_READ_PATH независимо от настройки окружения.
+urlpatterns = [
+    path('api/recipes/', async_views.recipe_list),
+    path('api/recipes/<int:pk>/', async_views.recipe_detail),
+    path('', include('foodgram.urls')),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__, CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}})
+class AsyncReadPathTests(TransactionTestCase):
+    """
+    Промахи кеша обрабатывает синхронный RecipeViewSet в пуле потоков;
+    ответы совпадают с синхронным режимом. TransactionTestCase: потоки
+    пула работают со своими подключениями и видят только
+    зафиксированные данные.
+    """
+
+    def setUp(self):
+        author = create_user('author')
+        self.user = create_user('reader')
+        self.token = Token.objects.create(user=self.user).key
+        tag = create_tag('breakfast')
+        ingredient = create_ingredient('соль')
+        # Без картинки: после коммита не строятся её варианты.
+        self.recipe = create_recipe(
+            author, ingredients=(ingredient,), tags=(tag,), image=''
+        )
+
+    async def get(self, url, token=None):
+        for cache in caches.all():
+            cache.clear()
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        return await self.async_client.get(url, headers=headers)
+
+    def sync_get(self, url, token=None):
+        for cache in caches.all():
+            cache.clear()
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        with self.settings(ROOT_URLCONF='foodgram.urls'):
+            return self.client.get(url, headers=headers)
+
+    async def queries(self, url):
+        with mock.patch.object(RequestMetricsMiddleware, '_report') as report:
+            response = await self.get(url, self.token)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        _, _, metrics, _ = report.call_args.args
+        return metrics.queries
+
+    async def test_no_repeated_queries(self):
+        """Промах не повторяет проверку токена и валидаторы карточки."""
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/'):
+            with self.subTest(url=url):
+                queries = await self.queries(url)
+                self.assertEqual(queries.duplicates(), [])
+                self.assertEqual(len([
+                    sql for sql, _ in queries.queries
+                    if Token._meta.db_table in sql
+                ]), 1)
+
+    async def test_misses_match_sync_views(self):
+        for url in (
+            '/api/recipes/', '/api/recipes/?is_favorited=1',
+            f'/api/recipes/{self.recipe.pk}/', '/api/recipes/999999/',
+        ):
+            for token in (None, self.token):
+                with self.subTest(url=url, authenticated=bool(token)):
+                    response = await self.get(url, token)
+                    expected = await sync_to_async(self.sync_get)(
+                        url, token
+                    )
+                    self.assertEqual(
+                        response.status_code, expected.status_code
+                    )
+                    self.assertEqual(response.content, expected.content)
+
+    async def test_misses_run_in_pool(self):
+        """Синхронное представление не занимает поток синхронного кода."""
+        sync_thread = await sync_to_async(threading.get_ident)()
+        threads = []
+        retrieve = RecipeViewSet.retrieve
+
+        def record(view, *args, **kwargs):
+            threads.append(threading.get_ident())
+            return retrieve(view, *args, **kwargs)
+
+        with mock.patch.object(RecipeViewSet, 'retrieve', record):
+            response = await self.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], sync_thread)
+
+
+@override_settings(ROOT_URLCONF=__name__, CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': TEMP_CACHE_DIR,
+}})
+class SharedCacheAsyncReadPathTests(AsyncReadPathTests):
+    """Те же проверки с общим кешем: ответами из кеша и валидаторами."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,62 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from recipes.models import Recipe
+from users.models import User
+
+from .factories import create_ingredient, create_recipe, create_user
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class RecountTests(TestCase):
+
+    def test_fixes_drift_quietly(self):
+        author = create_user('author')
+        create_recipe(author)
+        Recipe.objects.update(favorites_count=5)
+        out = StringIO()
+        call_command('recount', verbosity=0, stdout=out)
+        self.assertEqual(out.getvalue(), '')
+        author.refresh_from_db()
+        self.assertEqual(author.recipes_count, 1)
+        self.assertFalse(Recipe.objects.filter(favorites_count=5).exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateDatasetTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def generate(self, verbosity):
+        out = StringIO()
+        call_command(
+            'generate_dataset', users=5, recipes=20, images=1,
+            verbosity=verbosity, stdout=out
+        )
+        return out.getvalue().splitlines()
+
+    def setUp(self):
+        for name in ('соль', 'мука', 'сахар'):
+            create_ingredient(name)
+
+    def test_quiet(self):
+        """При verbosity=0 ни команда, ни дочерние команды ничего не пишут."""
+        self.assertEqual(self.generate(0), [])
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Recipe.objects.count(), 20)
+
+    def test_verbose(self):
+        output = '\n'.join(self.generate(1))
+        for line in (
+            'счётчики:', 'Счётчики пересчитаны.', 'Ленты пересобраны',
+            'Похожие рецепты пересчитаны', 'Набор данных создан.',
+        ):
+            self.assertIn(line, output)
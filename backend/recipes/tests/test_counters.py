@@ -0,0 +1,165 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from recipes.models import Favorite, Recipe, ShoppingCart, TimelineEntry
+from recipes.services import (
+    add_to_cart,
+    add_to_favorite,
+    bulk_add_to_cart,
+    bulk_add_to_favorite,
+    bulk_remove_from_favorite,
+    delete_recipe,
+    register_recipe,
+    remove_from_favorite,
+)
+from users.models import Subscription, User
+from users.services import add_subscription, bulk_add_subscriptions
+
+from .factories import create_recipe, create_user
+
+
+class CounterTests(TestCase):
+    """Счётчики не расходятся с таблицами при любом пути удаления."""
+
+    def setUp(self):
+        self.author = create_user('author')
+        self.recipe = create_recipe(self.author)
+        register_recipe(self.recipe)
+        self.fans = [create_user(f'fan{i}') for i in range(2)]
+        for fan in self.fans:
+            add_to_favorite(fan, self.recipe)
+            add_to_cart(fan, self.recipe)
+            add_subscription(fan, self.author)
+
+    def assertCounters(self, favorites, carts, followers):
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(
+            (
+                self.recipe.favorites_count, self.recipe.in_carts_count,
+                self.author.followers_count
+            ),
+            (favorites, carts, followers)
+        )
+
+    def test_services(self):
+        self.assertCounters(2, 2, 2)
+        remove_from_favorite(self.fans[0], self.recipe)
+        bulk_remove_from_favorite(self.fans[1], [self.recipe.pk])
+        self.assertCounters(0, 2, 2)
+
+    def test_bulk_add(self):
+        reader = create_user('reader')
+        other = create_recipe(self.author)
+        self.assertEqual(
+            bulk_add_to_favorite(reader, [self.recipe.pk, other.pk]),
+            {self.recipe.pk: True, other.pk: True}
+        )
+        bulk_add_to_cart(reader, [self.recipe.pk])
+        bulk_add_subscriptions(reader, [self.author.pk])
+        self.assertCounters(3, 3, 3)
+
+    def test_bulk_add_counts_inserted_rows(self):
+        """
+        Связи, созданные параллельным запросом после чтения _linked,
+        не увеличивают счётчики второй раз.
+        """
+        stale = {self.recipe.pk: False}
+        with mock.patch('recipes.services._linked', return_value=stale):
+            self.assertEqual(
+                bulk_add_to_favorite(self.fans[0], [self.recipe.pk]),
+                {self.recipe.pk: False}
+            )
+            bulk_add_to_cart(self.fans[0], [self.recipe.pk])
+        with mock.patch(
+            'recipes.services._linked', return_value={self.author.pk: False}
+        ):
+            bulk_add_subscriptions(self.fans[0], [self.author.pk])
+        self.assertCounters(2, 2, 2)
+
+    def test_user_cascade(self):
+        self.fans[0].delete()
+        self.assertCounters(1, 1, 1)
+        User.objects.filter(pk=self.fans[1].pk).delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_instance_delete(self):
+        Favorite.objects.filter(user=self.fans[0]).get().delete()
+        ShoppingCart.objects.filter(user=self.fans[0]).get().delete()
+        Subscription.objects.filter(user=self.fans[0]).get().delete()
+        self.assertCounters(1, 1, 1)
+
+    def test_queryset_delete(self):
+        for model in (Favorite, ShoppingCart, Subscription):
+            model.objects.all().delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_recipe_delete(self):
+        second = create_recipe(self.author)
+        register_recipe(second)
+        third = create_recipe(self.author)
+        register_recipe(third)
+        delete_recipe(self.recipe)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 2)
+        Recipe.objects.filter(author=self.author).delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 0)
+
+    def login_admin(self):
+        self.client.force_login(
+            create_user('admin', is_staff=True, is_superuser=True)
+        )
+
+    def test_admin(self):
+        self.login_admin()
+        reader = create_user('reader')
+        self.client.post('/admin/recipes/favorite/add/', {
+            'user': reader.pk, 'recipe': self.recipe.pk
+        })
+        self.assertCounters(3, 2, 2)
+        favorite = Favorite.objects.get(user=reader)
+        self.client.post(
+            f'/admin/recipes/favorite/{favorite.pk}/delete/', {'post': 'yes'}
+        )
+        self.client.post('/admin/recipes/favorite/', {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': [self.fans[0].favorites.get().pk]
+        })
+        self.assertCounters(1, 2, 2)
+
+    def test_admin_recipe_author_is_read_only(self):
+        self.login_admin()
+        for url, editable in (
+            ('/admin/recipes/recipe/add/', True),
+            (f'/admin/recipes/recipe/{self.recipe.pk}/change/', False),
+        ):
+            with self.subTest(url=url):
+                form = self.client.get(url).context['adminform'].form
+                self.assertEqual('author' in form.fields, editable)
+
+    def test_admin_subscription(self):
+        self.login_admin()
+        reader = create_user('reader')
+        response = self.client.post('/admin/users/subscription/add/', {
+            'user': reader.pk, 'author': self.author.pk
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertCounters(2, 2, 3)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=reader, recipe=self.recipe
+        ).exists())
+        subscription = Subscription.objects.get(user=reader)
+        self.client.post(
+            f'/admin/users/subscription/{subscription.pk}/delete/',
+            {'post': 'yes'}
+        )
+        self.client.post('/admin/users/subscription/', {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': [self.fans[0].following.get().pk]
+        })
+        self.assertCounters(2, 2, 1)
+        self.assertFalse(TimelineEntry.objects.filter(
+            user__in=[reader, self.fans[0]]
+        ).exists())
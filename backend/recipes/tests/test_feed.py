@@ -0,0 +1,109 @@
+from base64 import b64encode
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from recipes import feed
+from recipes.models import TimelineEntry
+from recipes.services import register_recipe
+from users.services import add_subscription, remove_subscription
+
+from .factories import create_recipe, create_user
+
+
+class ImmediateExecutor:
+    """Выполняет фоновую раскладку сразу, в соединении теста."""
+
+    def submit(self, function, recipe_id, author_id):
+        feed.fan_out_recipe(recipe_id, author_id)
+
+
+@mock.patch('recipes.feed.get_executor', ImmediateExecutor)
+class FeedTests(APITestCase):
+
+    def setUp(self):
+        self.reader, self.author, self.other, self.star = (
+            create_user(name) for name in ('reader', 'author', 'other', 'star')
+        )
+
+    def publish(self, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(author)
+            register_recipe(recipe)
+        return recipe
+
+    def entries(self, **filters):
+        return set(TimelineEntry.objects.filter(**filters).values_list(
+            'recipe_id', flat=True
+        ))
+
+    def feed_ids(self, url='/api/recipes/feed/?limit=4'):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            ids += [recipe['id'] for recipe in response.json()['results']]
+            url = response.json()['next']
+        return ids
+
+    def test_fan_out_after_commit(self):
+        add_subscription(self.reader, self.author)
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe = create_recipe(self.author)
+            register_recipe(recipe)
+        self.assertFalse(self.entries(user=self.reader))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.entries(user=self.reader), {recipe.pk})
+
+    @mock.patch('recipes.feed.FEED_BACKFILL_LIMIT', 2)
+    def test_backfill_limited_to_newest(self):
+        recipes = [self.publish(self.author) for _ in range(3)]
+        self.publish(self.other)
+        add_subscription(self.reader, self.author)
+        self.assertEqual(
+            self.entries(user=self.reader), {r.pk for r in recipes[1:]}
+        )
+
+    def test_unsubscribe_removes_entries(self):
+        add_subscription(self.reader, self.author)
+        self.publish(self.author)
+        remove_subscription(self.reader, self.author)
+        self.assertFalse(self.entries(user=self.reader))
+
+    @mock.patch('recipes.feed.FEED_FANOUT_LIMIT', 2)
+    def test_feed_merges_popular_authors(self):
+        """Рецепты популярного автора читаются запросом ленты."""
+        old = [self.publish(self.author) for _ in range(2)]
+        for user in (self.reader, self.other):
+            add_subscription(user, self.star)
+        for author in (self.author, self.other):
+            add_subscription(self.reader, author)
+        new = [
+            self.publish(author)
+            for author in (self.author, self.other, self.star) * 3
+        ]
+        self.assertFalse(self.entries(author=self.star))
+        self.client.force_authenticate(self.reader)
+        self.assertEqual(
+            self.feed_ids(),
+            sorted((r.pk for r in old + new), reverse=True)
+        )
+        call_command('rebuild_timelines', verbosity=0)
+        self.assertFalse(self.entries(author=self.star))
+        self.assertEqual(len(self.entries(user=self.reader)), 8)
+
+    def test_invalid_cursor(self):
+        self.client.force_authenticate(self.reader)
+        for cursor in ('zzz', b64encode(b'p=abc').decode()):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    f'/api/recipes/feed/?cursor={cursor}'
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_anonymous(self):
+        response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
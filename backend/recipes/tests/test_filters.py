@@ -0,0 +1,62 @@
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase
+
+from recipes.filters import RecipeFilter
+from recipes.models import Favorite, Recipe, RecipeTag, ShoppingCart
+
+from .factories import create_recipe, create_tag, create_user
+
+
+class RecipeFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.breakfast = create_tag('breakfast')
+        cls.dinner = create_tag('dinner')
+        author = create_user('author')
+        cls.both = create_recipe(
+            author, 'Оба тега', tags=(cls.breakfast, cls.dinner)
+        )
+        cls.other = create_recipe(author, 'Без флагов', tags=(cls.dinner,))
+        Favorite.objects.create(user=cls.user, recipe=cls.both)
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.both)
+
+    def filter(self, query):
+        request = RequestFactory().get('/api/recipes/')
+        request.user = self.user
+        return RecipeFilter(
+            QueryDict(query),
+            queryset=Recipe.objects.with_user_flags(self.user),
+            request=request
+        ).qs
+
+    def test_query_shape(self):
+        """Фильтры — подзапросы EXISTS без DISTINCT и без JOIN связей."""
+        sql = str(self.filter(
+            'is_favorited=1&is_in_shopping_cart=1'
+            '&tags=breakfast&tags=dinner'
+        ).query)
+        self.assertNotIn('DISTINCT', sql)
+        # Два флага в SELECT и три фильтра в WHERE.
+        self.assertEqual(sql.count('EXISTS'), 5)
+        for model in (Favorite, ShoppingCart, RecipeTag):
+            with self.subTest(model=model.__name__):
+                table = connection.ops.quote_name(model._meta.db_table)
+                self.assertNotIn(f'JOIN {table}', sql)
+
+    def test_no_duplicates(self):
+        self.assertQuerySetEqual(
+            self.filter('tags=breakfast&tags=dinner').order_by('id'),
+            [self.both, self.other]
+        )
+
+    def test_flags(self):
+        self.assertQuerySetEqual(
+            self.filter('is_favorited=1&is_in_shopping_cart=1'),
+            [self.both]
+        )
+        self.assertQuerySetEqual(
+            self.filter('is_favorited=0'), [self.other]
+        )
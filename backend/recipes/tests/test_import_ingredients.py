@@ -0,0 +1,121 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+ROWS = [('мука', 'г'), ('молоко', 'мл'), ('яйцо', 'шт.')]
+
+
+class ImportIngredientsTests(TestCase):
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, text):
+        path = self.directory / name
+        path.write_text(text, encoding='utf-8')
+        return path
+
+    def run_import(self, *paths, **options):
+        out = StringIO()
+        call_command(
+            'import_ingredients', *map(str, paths), stdout=out, **options
+        )
+        return out.getvalue()
+
+    def assertImported(self, path):
+        self.assertIn('Добавлено: 3,', self.run_import(path))
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', 'measurement_unit')),
+            set(ROWS)
+        )
+        self.assertIn('без изменений: 3,', self.run_import(path))
+        self.assertEqual(Ingredient.objects.count(), len(ROWS))
+
+    def test_csv(self):
+        self.assertImported(self.write('ingredients.csv', (
+            'name,measurement_unit\n'
+            + ''.join(f'{name},{unit}\n' for name, unit in ROWS)
+        )))
+
+    def test_json(self):
+        self.assertImported(self.write('ingredients.json', json.dumps([
+            {'name': name, 'measurement_unit': unit} for name, unit in ROWS
+        ])))
+
+    @mock.patch(
+        'recipes.management.commands.import_ingredients.JSON_CHUNK_SIZE', 7
+    )
+    def test_json_read_in_chunks(self):
+        self.assertImported(self.write('ingredients.json', json.dumps([
+            {'name': name, 'measurement_unit': unit} for name, unit in ROWS
+        ], ensure_ascii=False, indent=2)))
+
+    def test_invalid_json(self):
+        for text in ('{}', '[{"name": "мука"', '[{"name": }]'):
+            with self.subTest(text=text):
+                with self.assertRaisesMessage(CommandError, 'массив JSON'):
+                    self.run_import(self.write('ingredients.json', text))
+
+    def test_json_dumpdata(self):
+        self.assertImported(self.write('ingredients.json', json.dumps([
+            {
+                'model': 'recipes.ingredient', 'pk': pk,
+                'fields': {'name': name, 'measurement_unit': unit},
+            }
+            for pk, (name, unit) in enumerate(ROWS, 1)
+        ])))
+
+    def test_json_lines(self):
+        for suffix in ('jsonl', 'ndjson'):
+            with self.subTest(suffix=suffix):
+                Ingredient.objects.all().delete()
+                self.assertImported(self.write(
+                    f'ingredients.{suffix}', '\n'.join(
+                        json.dumps({'name': name, 'measurement_unit': unit})
+                        for name, unit in ROWS
+                    ) + '\n\n'
+                ))
+
+    def test_skips_invalid_rows(self):
+        path = self.write('ingredients.csv', (
+            'мука,г\n'
+            ' мука , г \n'
+            ',шт.\n'
+            f"{'х' * 200},г\n"
+        ))
+        self.assertIn('Добавлено: 1,', self.run_import(path))
+        self.assertIn('пропущено: 3.', self.run_import(path))
+
+    def test_updates_unnormalized_rows(self):
+        Ingredient.objects.create(name=' мука  ', measurement_unit='г')
+        Ingredient.objects.create(name='молоко', measurement_unit='\tмл')
+        output = self.run_import(self.write('ingredients.csv', ''.join(
+            f'{name},{unit}\n' for name, unit in ROWS
+        )))
+        self.assertIn('Добавлено: 1, обновлено: 2, без изменений: 0,', output)
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', 'measurement_unit')),
+            set(ROWS)
+        )
+
+    def test_quiet(self):
+        path = self.write('ingredients.csv', 'мука,г\n')
+        self.assertEqual(self.run_import(path, verbosity=0), '')
+        self.assertTrue(Ingredient.objects.filter(name='мука').exists())
+
+    def test_repository_fixture(self):
+        """Фикстура в формате dumpdata импортируется целиком."""
+        path = settings.BASE_DIR / 'recipes' / 'fixtures' / 'ingredients.json'
+        total = len(json.loads(path.read_text(encoding='utf-8')))
+        self.assertIn('пропущено: 0.', self.run_import(path))
+        self.assertEqual(Ingredient.objects.count(), total)
@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.cache import get_shared_cache
+from recipes.models import Recipe
+from recipes.response_cache import NS_PER_SECOND
+
+from .factories import create_recipe, create_tag, create_user
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+
+LOCAL_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+SHARED_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEMP_CACHE_DIR,
+    },
+}
+
+
+class ResponseCacheTestMixin:
+
+    def setUp(self):
+        self.recipe = create_recipe(create_user('author'), image='')
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+
+    def rename(self, name):
+        """Изменение в БД без сигналов: как запись в другом воркере."""
+        Recipe.objects.filter(pk=self.recipe.pk).update(name=name)
+
+    def names(self):
+        detail = self.client.get(self.url)
+        page = self.client.get('/api/recipes/')
+        self.assertEqual(detail.status_code, HTTPStatus.OK)
+        return detail.json()['name'], page.json()['results'][0]['name']
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class LocalCacheTests(ResponseCacheTestMixin, APITestCase):
+    """С локальным кешем процесса ответы не кешируются."""
+
+    def test_not_cached(self):
+        self.assertIsNone(get_shared_cache())
+        self.names()
+        self.rename('Новое название')
+        self.assertEqual(self.names(), ('Новое название',) * 2)
+
+    def test_no_detail_validators(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+
+@override_settings(CACHES=SHARED_CACHE)
+class SharedCacheTests(ResponseCacheTestMixin, APITestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        get_shared_cache().clear()
+        super().setUp()
+
+    def test_cached_until_invalidated(self):
+        self.names()
+        self.rename('Новое название')
+        self.assertEqual(self.names(), ('Рецепт',) * 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.get(pk=self.recipe.pk).save()
+        self.assertEqual(self.names(), ('Новое название',) * 2)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_tag_rename_changes_validators(self):
+        tag = create_tag('lunch')
+        self.recipe.tags.add(tag)
+        response = self.client.get(self.url)
+        validators = {
+            'HTTP_IF_NONE_MATCH': response['ETag'],
+            'HTTP_IF_MODIFIED_SINCE': response['Last-Modified'],
+        }
+        for header, value in validators.items():
+            self.assertEqual(
+                self.client.get(self.url, **{header: value}).status_code,
+                HTTPStatus.NOT_MODIFIED
+            )
+        later = time.time() + 60
+        with mock.patch('time.time', return_value=later), mock.patch(
+            'time.time_ns', return_value=int(later) * NS_PER_SECOND
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                tag.name = 'Обед'
+                tag.save()
+            for header, value in validators.items():
+                with self.subTest(header=header):
+                    response = self.client.get(self.url, **{header: value})
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+                    self.assertEqual(
+                        response.json()['tags'][0]['name'], 'Обед'
+                    )
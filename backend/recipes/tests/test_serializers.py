@@ -0,0 +1,86 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import ORJSONRenderer
+from recipes.serializers import (
+    RECIPE_ROW_FIELDS,
+    RecipeListSerializer,
+    RecipeRowSerializer,
+)
+from recipes.services import add_to_cart, add_to_favorite
+from recipes.views import RecipeViewSet
+from users.services import add_subscription
+
+from .factories import (
+    create_ingredient,
+    create_recipe,
+    create_tag,
+    create_user,
+)
+
+
+class RecipeRowContractTests(TestCase):
+    """
+    Быстрый путь чтения (RecipeRowSerializer и ORJSONRenderer) отдаёт
+    байт в байт тот же JSON, что RecipeListSerializer и JSONRenderer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author', avatar='users/avatar.png')
+        other = create_user('other', first_name='Аня «Повар»')
+        cls.reader = create_user('reader')
+        ingredients = [
+            create_ingredient(f'ингредиент "{index}"') for index in range(4)
+        ]
+        tags = [create_tag(slug) for slug in ('dinner', 'breakfast')]
+        recipes = [
+            create_recipe(
+                (author, other)[index % 2], name=f'Рецепт {index} ',
+                ingredients=ingredients[index:index + 3],
+                tags=tags[:index % 3], text='Шаг 1\n"Шаг 2"\\ ',
+            )
+            for index in range(4)
+        ]
+        create_recipe(author, name='Без фото', image='')
+        add_to_favorite(cls.reader, recipes[0])
+        add_to_cart(cls.reader, recipes[1])
+        add_subscription(cls.reader, author)
+
+    def make_request(self, user):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        return request
+
+    def assert_same_json(self, user):
+        request = self.make_request(user)
+        context = {'request': request}
+        queryset = RecipeViewSet.queryset.with_user_flags(request.user)
+        rows = queryset.prefetch_related(None).values(*RECIPE_ROW_FIELDS)
+        self.assertEqual(
+            ORJSONRenderer().render(
+                RecipeRowSerializer(rows, context=context).data
+            ),
+            JSONRenderer().render(
+                RecipeListSerializer(queryset, many=True, context=context).data
+            )
+        )
+        for recipe in queryset:
+            row = rows.get(pk=recipe.pk)
+            self.assertEqual(
+                ORJSONRenderer().render(
+                    RecipeRowSerializer([row], context=context).data[0]
+                ),
+                JSONRenderer().render(
+                    RecipeListSerializer(recipe, context=context).data
+                )
+            )
+
+    def test_anonymous(self):
+        self.assert_same_json(AnonymousUser())
+
+    def test_authenticated(self):
+        self.assert_same_json(self.reader)
@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from recipes.cache import get_shared_cache
+from recipes.models import ShoppingCart
+from recipes.services import add_to_cart, iter_shopping_list
+
+from .factories import create_ingredient, create_recipe, create_user
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+
+
+class ShoppingListTestMixin:
+
+    def setUp(self):
+        self.user = create_user('buyer')
+        author = create_user('author')
+        self.salt, self.sugar = (
+            create_ingredient(name) for name in ('соль', 'сахар')
+        )
+        self.salty = create_recipe(author, ingredients=(self.salt,))
+        self.sweet = create_recipe(
+            author, ingredients=(self.salt, self.sugar)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            add_to_cart(self.user, self.salty)
+
+    def add_elsewhere(self):
+        """Добавление в корзину, версию которой сдвинул другой воркер."""
+        ShoppingCart.objects.create(user=self.user, recipe=self.sweet)
+
+    def shopping_list(self):
+        return list(iter_shopping_list(self.user))
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}})
+class LocalCacheTests(ShoppingListTestMixin, TestCase):
+    """С локальным кешем процесса список каждый раз читается из БД."""
+
+    def test_not_cached(self):
+        self.assertIsNone(get_shared_cache())
+        self.assertEqual(self.shopping_list(), [('соль', 'г', 1)])
+        self.add_elsewhere()
+        self.assertEqual(
+            self.shopping_list(), [('сахар', 'г', 1), ('соль', 'г', 2)]
+        )
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': TEMP_CACHE_DIR,
+}})
+class SharedCacheTests(ShoppingListTestMixin, TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        get_shared_cache().clear()
+        super().setUp()
+
+    def test_cached_until_cart_changes(self):
+        self.assertEqual(self.shopping_list(), [('соль', 'г', 1)])
+        self.add_elsewhere()
+        self.assertEqual(self.shopping_list(), [('соль', 'г', 1)])
+        self.user.shopping_cart.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            add_to_cart(self.user, self.sweet)
+        self.assertEqual(
+            self.shopping_list(), [('сахар', 'г', 1), ('соль', 'г', 1)]
+        )
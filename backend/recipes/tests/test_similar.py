@@ -0,0 +1,116 @@
+from http import HTTPStatus
+from unittest.mock import patch
+
+from django.core.cache import caches
+from rest_framework.test import APITestCase
+
+from recipes.models import SimilarRecipe
+from recipes import similar
+from recipes.similar import rebuild_similar, update_similar
+
+from .factories import (
+    create_ingredient,
+    create_recipe,
+    create_tag,
+    create_user,
+)
+
+
+class SimilarRecipeTests(APITestCase):
+    """Таблица соседей и эндпоинт /api/recipes/{id}/similar/."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.author = create_user('author')
+        a, b, c, d, e = (
+            create_ingredient(name) for name in ('а', 'б', 'в', 'г', 'д')
+        )
+        self.tag = create_tag('lunch')
+        self.base = self.create(a, b, c, tags=(self.tag,))
+        # Сходство с base: 4/4, 3/5 и 1/5; lone делит с far только «д».
+        self.twin = self.create(a, b, c, tags=(self.tag,))
+        self.close = self.create(a, b, d, tags=(self.tag,))
+        self.far = self.create(a, e)
+        self.lone = self.create(e)
+        self.ingredients = (a, b, d)
+
+    def create(self, *ingredients, tags=()):
+        return create_recipe(self.author, ingredients=ingredients, tags=tags)
+
+    def neighbours(self, recipe):
+        return list(SimilarRecipe.objects.filter(recipe=recipe).values_list(
+            'similar_id', 'score'
+        ))
+
+    def get_similar(self, pk):
+        return self.client.get(f'/api/recipes/{pk}/similar/')
+
+    def test_rebuild(self):
+        self.assertEqual(
+            rebuild_similar(batch_size=2), SimilarRecipe.objects.count()
+        )
+        self.assertEqual(self.neighbours(self.base), [
+            (self.twin.pk, 1.0), (self.close.pk, 0.6), (self.far.pk, 0.2)
+        ])
+        self.assertEqual(self.neighbours(self.lone), [
+            (self.far.pk, 0.5)
+        ])
+
+    def test_batch_size_does_not_change_result(self):
+        rebuild_similar(batch_size=1)
+        by_one = list(SimilarRecipe.objects.order_by(
+            'recipe_id', '-score'
+        ).values_list('recipe_id', 'similar_id', 'score'))
+        rebuild_similar(batch_size=100)
+        self.assertEqual(by_one, list(SimilarRecipe.objects.order_by(
+            'recipe_id', '-score'
+        ).values_list('recipe_id', 'similar_id', 'score')))
+
+    def test_loads_only_batch_and_candidates(self):
+        with patch.object(
+            similar, 'load_features', wraps=similar.load_features
+        ) as load_features:
+            rebuild_similar(batch_size=1)
+        loaded = [set(call.args[0]) for call in load_features.call_args_list]
+        self.assertIn({self.lone.pk, self.far.pk}, loaded)
+        self.assertEqual(len(loaded), 5)
+
+    @patch('recipes.similar.SIMILAR_MAX_POSTING', 3)
+    def test_frequent_ingredient_not_candidate(self):
+        # «а» есть в четырёх рецептах: far связан с base только ею.
+        rebuild_similar()
+        self.assertEqual(self.neighbours(self.base), [
+            (self.twin.pk, 1.0), (self.close.pk, 0.6)
+        ])
+
+    def test_update_similar(self):
+        rebuild_similar()
+        copy = self.create(*self.ingredients, tags=(self.tag,))
+        update_similar(copy.pk)
+        self.assertEqual(self.neighbours(copy)[0], (self.close.pk, 1.0))
+        self.assertEqual(self.neighbours(self.close)[0], (copy.pk, 1.0))
+        self.assertIn((copy.pk, 0.6), self.neighbours(self.base))
+
+    def test_ordered_by_score(self):
+        rebuild_similar()
+        expected = [self.twin.pk, self.close.pk, self.far.pk]
+        response = self.get_similar(self.base.pk)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual([row['id'] for row in response.json()], expected)
+        self.client.force_authenticate(self.author)
+        response = self.get_similar(self.base.pk)
+        self.assertEqual([row['id'] for row in response.json()], expected)
+        self.assertIs(response.json()[0]['is_favorited'], False)
+
+    def test_without_neighbours(self):
+        response = self.get_similar(self.lone.pk)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json(), [])
+
+    def test_not_found(self):
+        for pk in ('abc', '999999'):
+            with self.subTest(pk=pk):
+                self.assertEqual(
+                    self.get_similar(pk).status_code, HTTPStatus.NOT_FOUND
+                )
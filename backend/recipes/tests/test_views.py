@@ -0,0 +1,32 @@
+from http import HTTPStatus
+
+from rest_framework.test import APITestCase
+
+from .factories import create_recipe, create_user
+
+
+class RecipeLookupTests(APITestCase):
+    """Нечисловой id рецепта в адресе — 404, а не ошибка сервера."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = create_recipe(create_user('author'))
+
+    def test_get_link(self):
+        response = self.client.get(
+            f'/api/recipes/{self.recipe.pk}/get-link/'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('/s/', response.json()['short-link'])
+
+    def test_get_link_invalid_pk(self):
+        for pk in ('abc', '999999'):
+            with self.subTest(pk=pk):
+                response = self.client.get(f'/api/recipes/{pk}/get-link/')
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_detail_invalid_pk(self):
+        for pk in ('abc', '999999'):
+            with self.subTest(pk=pk):
+                response = self.client.get(f'/api/recipes/{pk}/')
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
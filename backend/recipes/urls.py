@@ -1,11 +1,15 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import (
+    FavoriteBulkView,
     FavoriteView,
     IngredientDetailView,
     IngredientListView,
     RecipeViewSet,
+    ShoppingCartBulkView,
     ShoppingCartView,
     TagDetailView,
     TagListView,
@@ -27,6 +31,16 @@ urlpatterns = [
         IngredientDetailView.as_view(),
         name='ingredients-detail'
     ),
+    path(
+        'recipes/favorite/',
+        FavoriteBulkView.as_view(),
+        name='recipe-favorite-bulk'
+    ),
+    path(
+        'recipes/shopping_cart/',
+        ShoppingCartBulkView.as_view(),
+        name='recipe-cart-bulk'
+    ),
     path(
         'recipes/<int:pk>/favorite/',
         FavoriteView.as_view(),
@@ -45,3 +59,25 @@ urlpatterns = [
 ]
 
 urlpatterns += router.urls
+
+if settings.ASYNC_READ_PATH:
+    urlpatterns = [
+        path('tags/', async_views.tag_list, name='tags-list'),
+        path('tags/<int:pk>/', async_views.tag_detail, name='tags-detail'),
+        path(
+            'ingredients/',
+            async_views.ingredient_list,
+            name='ingredients-list'
+        ),
+        path(
+            'ingredients/<int:pk>/',
+            async_views.ingredient_detail,
+            name='ingredients-detail'
+        ),
+        path('recipes/', async_views.recipe_list, name='recipes-list'),
+        path(
+            'recipes/<int:pk>/',
+            async_views.recipe_detail,
+            name='recipes-detail'
+        ),
+    ] + urlpatterns
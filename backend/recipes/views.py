@@ -1,32 +1,70 @@
-import secrets
+import time
 from http import HTTPStatus
 
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, redirect
+from api.bulk import bulk_response, get_bulk_ids
+from api.conditional import conditional_response, set_validators
+from api.pagination import FeedPagination
+from api.renderers import (
+    CSVRenderer,
+    PlainTextRenderer,
+    PrintableHTMLRenderer,
+)
+from api.replicas import use_primary
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import redirect
 from rest_framework import generics, viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from users.permissions import IsAuthorOrReadOnly
 
-from .filters import IngredientFilter, RecipeFilter
-from .models import Ingredient, Recipe, ShortLink, Tag
+from .cache import (
+    get_cache,
+    get_or_build,
+    json_response,
+    make_key,
+    render,
+)
+from .constants import SIMILAR_RECIPES_COUNT
+from .exporters import EXPORTERS
+from .feed import feed_recipe_ids
+from .filters import RecipeFilter
+from .ingredient_index import ingredient_index
+from .models import Ingredient, Recipe, Tag
+from .response_cache import (
+    NAMESPACE,
+    detail_validators,
+    is_cacheable,
+    overlay_user_flags,
+    request_key,
+)
 from .serializers import (
+    RECIPE_ROW_FIELDS,
     IngredientSerializer,
     RecipeCreateUpdateSerializer,
     RecipeListSerializer,
     RecipeMinifiedSerializer,
+    RecipeRowSerializer,
     TagSerializer,
 )
 from .services import (
     add_to_cart,
     add_to_favorite,
-    aggregate_shopping_list,
+    bulk_add_to_cart,
+    bulk_add_to_favorite,
+    bulk_remove_from_cart,
+    bulk_remove_from_favorite,
+    delete_recipe,
+    iter_shopping_list,
     remove_from_cart,
     remove_from_favorite,
 )
+from .shortlinks import encode_recipe_id, resolve_code
 
 
 class TagListView(generics.ListAPIView):
@@ -35,12 +73,19 @@ class TagListView(generics.ListAPIView):
     Используется для отображения доступных тегов (например, в фильтрах).
     Не требует аутентификации.
     Пагинация отключена — возвращает все теги сразу.
+    Ответ берётся из кеша справочников и поддерживает ETag.
     """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        body = get_or_build('tags', 'list', lambda: render(
+            self.get_serializer(self.get_queryset(), many=True).data
+        ))
+        return json_response(request, body)
+
 
 class TagDetailView(generics.RetrieveAPIView):
     """
@@ -51,16 +96,29 @@ class TagDetailView(generics.RetrieveAPIView):
     permission_classes = [AllowAny]
     pagination_class = None
 
+    def retrieve(self, request, *args, **kwargs):
+        body = get_or_build('tags', kwargs['pk'], lambda: render(
+            self.get_serializer(self.get_object()).data
+        ))
+        return json_response(request, body)
+
 
 class IngredientListView(generics.ListAPIView):
     """
     Возвращает список всех ингредиентов с возможностью поиска по названию.
+    Поиск по префиксу обслуживается индексом в памяти без запросов к БД,
+    число результатов поиска ограничено INGREDIENT_SEARCH_LIMIT.
     """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [AllowAny]
     pagination_class = None
-    filterset_class = IngredientFilter
+
+    def list(self, request, *args, **kwargs):
+        return json_response(
+            request,
+            ingredient_index.search_json(request.query_params.get('name', ''))
+        )
 
 
 class IngredientDetailView(generics.RetrieveAPIView):
@@ -72,6 +130,12 @@ class IngredientDetailView(generics.RetrieveAPIView):
     permission_classes = [AllowAny]
     pagination_class = None
 
+    def retrieve(self, request, *args, **kwargs):
+        body = get_or_build('ingredients', kwargs['pk'], lambda: render(
+            self.get_serializer(self.get_object()).data
+        ))
+        return json_response(request, body)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """
@@ -81,31 +145,111 @@ class RecipeViewSet(viewsets.ModelViewSet):
         Recipe.objects.select_related('author')
         .prefetch_related('tags', 'recipe_ingredients__ingredient')
         .order_by('-id')
-        .distinct()
     )
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        """Добавляет флаги избранного и корзины текущего пользователя."""
+        return super().get_queryset().with_user_flags(self.request.user)
+
+    def _cached_response(self, request, build, *key_parts):
+        """
+        Отдаёт тело ответа из кеша анонимных ответов (response_cache).
+        Промах у анонимного пользователя заполняет кеш, у авторизованного
+        обрабатывается обычным образом. Вместе с телом хранится время
+        его построения: оно служит Last-Modified для анонимов, так как
+        любое изменение сбрасывает кеш. Кешируемое тело строится по
+        основной БД (см. api.replicas).
+        """
+        if not is_cacheable(request):
+            return build()
+        cache = get_cache()
+        key = make_key(NAMESPACE, request_key(request, *key_parts))
+        entry = cache.get(key)
+        if entry is None:
+            if request.user.is_authenticated:
+                return build()
+            with use_primary():
+                response = build()
+            entry = (render(response.data), int(time.time()))
+            cache.set(key, entry, settings.CATALOGUE_CACHE_TIMEOUT)
+        body, built_at = entry
+        if request.user.is_authenticated:
+            response = json_response(
+                request, render(overlay_user_flags(body, request.user))
+            )
+        else:
+            response = json_response(request, body, last_modified=built_at)
+        return set_validators(response)
+
+    def get_rows(self, queryset):
+        """
+        Строки values() для быстрого пути чтения (RecipeRowSerializer):
+        list, retrieve, feed и similar отдают тот же JSON, что
+        RecipeListSerializer, без объектов моделей.
+        """
+        return queryset.prefetch_related(None).values(*RECIPE_ROW_FIELDS)
+
+    def represent_rows(self, rows):
+        return RecipeRowSerializer(
+            rows, context=self.get_serializer_context()
+        ).data
+
+    def _list(self):
+        rows = self.get_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(self.represent_rows(rows))
+        return self.get_paginated_response(self.represent_rows(page))
+
+    def _retrieve(self, pk):
+        row = get_object_or_404(
+            self.get_rows(self.filter_queryset(self.get_queryset())), pk=pk
+        )
+        return Response(self.represent_rows([row])[0])
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, self._list, 'list')
+
+    def retrieve(self, request, *args, **kwargs):
+        """Карточка рецепта; при неизменном рецепте — 304 без тела."""
+        def build():
+            return self._cached_response(
+                request, lambda: self._retrieve(kwargs['pk']),
+                'detail', kwargs['pk']
+            )
+
+        if hasattr(request, 'detail_validators'):
+            # Уже посчитаны асинхронным представлением (async_views).
+            validators = request.detail_validators
+        else:
+            validators = detail_validators(request.user, kwargs['pk'])
+        if validators is None:
+            return build()
+        return conditional_response(request, build, **validators)
+
     def get_permissions(self):
         """
         Динамически назначает права в зависимости от действия:
         - create: только авторизованный пользователь.
         - partial_update, destroy: авторизованный + проверка авторства.
-        - остальные (list, retrieve): разрешено всем.
+        - остальные: права из @action, для list и retrieve — разрешено всем.
         """
         if self.action == 'create':
             return [IsAuthenticated()]
         if self.action in ('partial_update', 'destroy'):
             return [IsAuthenticated(), IsAuthorOrReadOnly()]
-        return [AllowAny()]
+        return super().get_permissions()
 
     def get_serializer_class(self):
         """
         Использует разные сериализаторы:
-        - RecipeListSerializer — для списка и деталей.
+        - RecipeListSerializer — для списка, деталей, ленты и похожих.
         - RecipeCreateUpdateSerializer — для создания и редактирования.
         """
         return (
-            RecipeListSerializer if self.action in ('list', 'retrieve')
+            RecipeListSerializer
+            if self.action in ('list', 'retrieve', 'feed', 'similar')
             else RecipeCreateUpdateSerializer
         )
 
@@ -123,34 +267,87 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_link(self, request, pk=None):
         """Возвращает короткую ссылку на рецепт."""
 
-        recipe = self.get_object()
-        link, _ = ShortLink.objects.get_or_create(
-            recipe=recipe, defaults={'code': secrets.token_urlsafe(3)}
+        recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        return Response({
+            'short-link': self._build_short_link(
+                request, encode_recipe_id(recipe.id)
+            )
+        })
+
+    @action(
+        detail=False, methods=['get'],
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedPagination
+    )
+    def feed(self, request):
+        """Лента рецептов авторов из подписок, от новых к старым.
+        Пагинация по курсору (?cursor=, ?limit=): id страницы выбираются
+        из таблицы лент и рецептов популярных авторов (recipes.feed).
+        """
+        cursor = self.paginator.get_cursor(request)
+        recipe_ids = feed_recipe_ids(
+            request.user,
+            cursor.offset + self.paginator.get_page_size(request) + 1,
+            cursor.position, cursor.reverse
         )
-        return Response(
-            {'short-link': self._build_short_link(request, link.code)}
+        page = self.paginate_queryset(
+            self.get_rows(self.get_queryset().filter(id__in=recipe_ids))
         )
+        return self.get_paginated_response(self.represent_rows(page))
+
+    @action(
+        detail=True, methods=['get'], permission_classes=[AllowAny]
+    )
+    def similar(self, request, pk=None):
+        """Похожие рецепты по ингредиентам и тегам (recipes.similar).
+        Соседи берутся из заранее посчитанной таблицы одним запросом
+        по индексу; пустой список проверяется на существование рецепта.
+        Нечисловой id, как и в get_object_or_404, даёт 404.
+        """
+        def build():
+            try:
+                neighbours = self.get_queryset().filter(
+                    similar_to__recipe_id=pk
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise Http404
+            rows = self.get_rows(
+                neighbours.order_by('-similar_to__score')
+            )[:SIMILAR_RECIPES_COUNT]
+            if not rows and not Recipe.objects.filter(pk=pk).exists():
+                raise Http404
+            return Response(self.represent_rows(rows))
+
+        return self._cached_response(request, build, 'similar', pk)
 
     @action(
         detail=False, methods=['get'],
         permission_classes=[IsAuthenticated],
-        url_path='download_shopping_cart'
+        url_path='download_shopping_cart',
+        renderer_classes=[
+            PlainTextRenderer, CSVRenderer, PrintableHTMLRenderer
+        ]
     )
     def download_shopping_cart(self, request):
         """Скачать агрегированный список покупок.
         Суммирует одинаковые ингредиенты по всем рецептам в корзине.
+        Формат выбирается параметром ?format=txt|csv|html (по умолчанию
+        txt), ответ отдаётся потоком.
         """
-        lines = aggregate_shopping_list(request.user)
-        header = 'Список покупок: \n'
-        body = '\n'.join(lines) if lines else 'Список пуст.'
-        response = HttpResponse(
-            header + body, content_type='text/plain; charset=utf-8'
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            EXPORTERS[renderer.format](iter_shopping_list(request.user)),
+            content_type=f'{renderer.media_type}; charset=utf-8'
         )
+        disposition = 'inline' if renderer.format == 'html' else 'attachment'
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+            f'{disposition}; filename="shopping_list.{renderer.format}"'
         )
         return response
 
+    def perform_destroy(self, instance):
+        delete_recipe(instance)
+
 
 class FavoriteView(APIView):
     """
@@ -214,6 +411,49 @@ class ShoppingCartView(APIView):
         return Response(status=HTTPStatus.NO_CONTENT)
 
 
+class FavoriteBulkView(APIView):
+    """
+    Пакетное добавление/удаление рецептов в избранном по списку
+    {"ids": [...]}. Отвечает картой итогов по каждому id.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return bulk_response(
+            bulk_add_to_favorite(request.user, get_bulk_ids(request)),
+            HTTPStatus.CREATED, 'Рецепт уже в избранном.'
+        )
+
+    def delete(self, request):
+        return bulk_response(
+            bulk_remove_from_favorite(request.user, get_bulk_ids(request)),
+            HTTPStatus.NO_CONTENT, 'Рецепта не было в избранном.'
+        )
+
+
+class ShoppingCartBulkView(APIView):
+    """
+    Пакетное добавление/удаление рецептов в списке покупок по списку
+    {"ids": [...]}. Отвечает картой итогов по каждому id.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return bulk_response(
+            bulk_add_to_cart(request.user, get_bulk_ids(request)),
+            HTTPStatus.CREATED, 'Уже в списке покупок.'
+        )
+
+    def delete(self, request):
+        return bulk_response(
+            bulk_remove_from_cart(request.user, get_bulk_ids(request)),
+            HTTPStatus.NO_CONTENT, 'Не было в списке покупок.'
+        )
+
+
 def shortlink_redirect(request, code: str):
-    link = get_object_or_404(ShortLink, code=code)
-    return redirect(f'/recipes/{link.recipe.id}/')
+    """Редирект по короткой ссылке, обычно без обращения к БД."""
+    recipe_id = resolve_code(code)
+    if recipe_id is None:
+        raise Http404
+    return redirect(f'/recipes/{recipe_id}/')
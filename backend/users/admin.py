@@ -1,17 +1,46 @@
+from api.admin import CountedLinkAdmin
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 
 from .models import Subscription, User
+from .services import add_subscription, remove_subscription
 
 
 @admin.register(User)
 class UserAdmin(DjangoUserAdmin):
-    list_display = ('id', 'email', 'username', 'first_name', 'last_name')
+    list_display = (
+        'id', 'email', 'username', 'first_name', 'last_name',
+        'recipes_count', 'followers_count'
+    )
     search_fields = ('email', 'username')
     ordering = ('email',)
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(CountedLinkAdmin):
+    """
+    Подписки создаются и удаляются сервисами, которые обновляют ленту
+    подписчика. Перенос подписки на другого автора не поддерживается.
+    """
     list_display = ('user', 'author')
     ordering = ('user', 'author')
+
+    def get_readonly_fields(self, request, obj=None):
+        fields = super().get_readonly_fields(request, obj)
+        return fields if obj is None else (*fields, 'user', 'author')
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            super().save_model(request, obj, form, change)
+            return
+        add_subscription(obj.user, obj.author)
+        obj.pk = Subscription.objects.values_list('pk', flat=True).get(
+            user=obj.user, author=obj.author
+        )
+
+    def delete_model(self, request, obj):
+        remove_subscription(obj.user, obj.author)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset.select_related('user', 'author'):
+            remove_subscription(obj.user, obj.author)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_variants_for',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Варианты построены для аватара'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from api.counters import CountedLink, CountedLinkQuerySet
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
@@ -15,6 +16,17 @@ class User(AbstractUser):
         'Аватар', upload_to='users/',
         null=True, blank=True
     )
+    avatar_variants_for = models.CharField(
+        'Варианты построены для аватара', max_length=100, blank=True,
+        editable=False
+    )
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков', default=0, editable=False
+    )
+    updated_at = models.DateTimeField('Изменён', auto_now=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -28,9 +40,11 @@ class User(AbstractUser):
         return self.email
 
 
-class Subscription(models.Model):
+class Subscription(CountedLink, models.Model):
     """Подписка на автора."""
 
+    link_counter = ('author', 'followers_count')
+
     user = models.ForeignKey(
         'User', on_delete=models.CASCADE, related_name='following'
     )
@@ -38,6 +52,8 @@ class Subscription(models.Model):
         'User', on_delete=models.CASCADE, related_name='follower'
     )
 
+    objects = CountedLinkQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'author')
         verbose_name = 'Подписка'
@@ -1,4 +1,6 @@
-from api.fields import Base64ImageField
+from api.fields import Base64ImageField, ImageVariantsField
+from api.images import AVATAR_VARIANTS, RECIPE_IMAGE_VARIANTS
+from api.instrumentation import TimedSerializerMixin
 from rest_framework import serializers
 
 from recipes.models import Recipe
@@ -6,24 +8,34 @@ from recipes.models import Recipe
 from .models import User
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
     avatar = serializers.ImageField(read_only=True)
+    avatar_variants = ImageVariantsField(AVATAR_VARIANTS, source='avatar')
 
     class Meta:
         model = User
         fields = (
             'email', 'id', 'username',
             'first_name', 'last_name',
-            'is_subscribed', 'avatar'
+            'is_subscribed', 'avatar', 'avatar_variants'
         )
         read_only_fields = ('id',)
 
     def get_is_subscribed(self, obj):
+        """
+        Id авторов, на которых подписан пользователь, загружаются один раз
+        и кладутся в общий контекст: его разделяют все вложенные
+        сериализаторы, поэтому запрос не повторяется для каждой строки.
+        """
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
-        return request.user.following.filter(author=obj).exists()
+        if 'subscribed_ids' not in self.context:
+            self.context['subscribed_ids'] = set(
+                request.user.following.values_list('author_id', flat=True)
+            )
+        return obj.id in self.context['subscribed_ids']
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -39,36 +51,37 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return user
 
 
-class RecipeMinifiedSerializer(serializers.ModelSerializer):
+class RecipeMinifiedSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
+    image_variants = ImageVariantsField(RECIPE_IMAGE_VARIANTS, source='image')
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class UserWithRecipesSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        qs = obj.recipes.all()
-        if request:
-            limit = request.query_params.get('recipes_limit')
-            try:
-                if limit is not None:
-                    limit_int = int(limit)
-                    if limit_int >= 0:
-                        qs = qs[:limit_int]
-            except (TypeError, ValueError):
-                pass
+        """
+        Использует рецепты, заранее выбранные во вьюсете
+        (атрибут limited_recipes), иначе делает срез по recipes_limit
+        из контекста.
+        """
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            limit = self.context.get('recipes_limit')
+            if limit is not None:
+                recipes = recipes[:limit]
         return RecipeMinifiedSerializer(
-            qs, many=True, context=self.context
+            recipes, many=True, context=self.context
         ).data
 
 
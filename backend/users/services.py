@@ -0,0 +1,55 @@
+from api.counters import change_counter
+from django.db import transaction
+
+from recipes.feed import (
+    add_authors_to_timeline,
+    remove_authors_from_timeline,
+)
+from recipes.services import bulk_link, bulk_unlink
+
+from .models import Subscription, User
+
+
+@transaction.atomic
+def add_subscription(user, author: User) -> bool:
+    obj, created = Subscription.objects.get_or_create(
+        user=user, author=author
+    )
+    if created:
+        change_counter(User, author.pk, 'followers_count', 1)
+        add_authors_to_timeline(user, [author.pk])
+    return created
+
+
+@transaction.atomic
+def remove_subscription(user, author: User) -> bool:
+    deleted, _ = user.following.filter(author=author).delete()
+    if deleted:
+        remove_authors_from_timeline(user, [author.pk])
+    return bool(deleted)
+
+
+def _changed(outcomes):
+    return [pk for pk, changed in outcomes.items() if changed]
+
+
+@transaction.atomic
+def bulk_add_subscriptions(user, ids):
+    """
+    Подписка на несколько авторов. Подписка на себя нарушает
+    ограничение таблицы, поэтому свой id исключается заранее
+    и в итоге получает False.
+    """
+    outcomes = bulk_link(
+        user, Subscription, 'author',
+        [pk for pk in ids if pk != user.pk], 'followers_count'
+    )
+    add_authors_to_timeline(user, _changed(outcomes))
+    return {pk: outcomes.get(pk, False) for pk in ids}
+
+
+@transaction.atomic
+def bulk_remove_subscriptions(user, ids):
+    outcomes = bulk_unlink(user, Subscription, 'author', ids)
+    remove_authors_from_timeline(user, _changed(outcomes))
+    return outcomes
@@ -0,0 +1,49 @@
+from api.authentication import forget_tokens, forget_user_tokens
+from api.images import AVATAR_VARIANTS, delete_variants, schedule_variants
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django_cleanup.signals import cleanup_post_delete
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Favorite, ShoppingCart
+
+from .models import Subscription, User
+
+
+@receiver(post_save, sender=User)
+def build_avatar_variants(instance, update_fields=None, **kwargs):
+    if update_fields is None or 'avatar' in update_fields:
+        schedule_variants(instance.avatar, AVATAR_VARIANTS)
+
+
+@receiver(cleanup_post_delete, sender=User)
+def delete_avatar_variants(file, file_name, success, **kwargs):
+    """Удаляет варианты вместе с заменённым или удалённым аватаром."""
+    if success:
+        delete_variants(file.storage, file_name, AVATAR_VARIANTS)
+
+
+@receiver(post_save, sender=User)
+def forget_cached_user(instance, **kwargs):
+    """
+    Кешированный пользователь устаревает при любом сохранении: смене
+    пароля, профиля, аватара или is_active.
+    """
+    forget_user_tokens(instance)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(instance, **kwargs):
+    """Выход (удаление токена) сразу закрывает доступ по нему."""
+    forget_tokens([instance.key])
+
+
+@receiver(pre_delete, sender=User)
+def uncount_user_links(instance, **kwargs):
+    """
+    Каскад удаляет избранное, корзину и подписки пользователя в обход
+    delete() кверисета, поэтому счётчики рецептов и авторов уменьшаются
+    заранее, в той же транзакции.
+    """
+    for model in (Favorite, ShoppingCart, Subscription):
+        model.objects.filter(user=instance).uncount()
@@ -0,0 +1,28 @@
+from http import HTTPStatus
+
+from rest_framework.test import APITestCase
+
+from recipes.tests.factories import create_user
+
+
+class UserProfileTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+
+    def test_retrieve(self):
+        response = self.client.get(f'/api/users/{self.user.pk}/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['username'], 'user')
+
+    def test_retrieve_invalid_pk(self):
+        """Нечисловой id — 404, а не ошибка сервера."""
+        for pk in ('abc', '999999'):
+            for user in (None, self.user):
+                with self.subTest(pk=pk, authenticated=bool(user)):
+                    self.client.force_authenticate(user)
+                    response = self.client.get(f'/api/users/{pk}/')
+                    self.assertEqual(
+                        response.status_code, HTTPStatus.NOT_FOUND
+                    )
@@ -1,12 +1,18 @@
 from http import HTTPStatus
 
+from api.bulk import bulk_response, get_bulk_ids
+from api.conditional import conditional_response, make_etag, timestamp
+from api.images import AVATAR_VARIANTS, delete_variants
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, F, OuterRef, Prefetch, Value, Window
+from django.db.models.functions import RowNumber
 from rest_framework import mixins, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from .models import Subscription
+from recipes.models import Recipe
+
 from .serializers import (
     SetAvatarSerializer,
     SetPasswordSerializer,
@@ -14,6 +20,12 @@ from .serializers import (
     UserSerializer,
     UserWithRecipesSerializer,
 )
+from .services import (
+    add_subscription,
+    bulk_add_subscriptions,
+    bulk_remove_subscriptions,
+    remove_subscription,
+)
 
 User = get_user_model()
 
@@ -47,12 +59,55 @@ class UserViewSet(
             if self.action == 'create' else UserSerializer
         )
 
+    @staticmethod
+    def _profile_validators(viewer, user_id, updated_at, is_subscribed):
+        """
+        ETag профиля по времени изменения и флагу подписки. Last-Modified
+        не отдаётся чужому профилю для авторизованного пользователя:
+        подписка меняется без изменения профиля.
+        """
+        own = viewer.is_authenticated and viewer.pk == user_id
+        return {
+            'etag': make_etag('user', user_id, updated_at, is_subscribed),
+            'last_modified': (
+                timestamp(updated_at)
+                if own or not viewer.is_authenticated else None
+            ),
+        }
+
+    def retrieve(self, request, *args, **kwargs):
+        """Профиль пользователя; при неизменном профиле — 304 без тела."""
+        viewer = request.user
+        try:
+            row = User.objects.filter(pk=kwargs['pk']).annotate(
+                is_subscribed=Exists(
+                    viewer.following.filter(author=OuterRef('pk'))
+                ) if viewer.is_authenticated else Value(False)
+            ).values('pk', 'updated_at', 'is_subscribed').first()
+        except (TypeError, ValueError):
+            row = None
+        if row is None:
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_response(
+            request,
+            lambda: super(UserViewSet, self).retrieve(
+                request, *args, **kwargs
+            ),
+            **self._profile_validators(viewer, *row.values())
+        )
+
     @action(
         detail=False, methods=['get'], permission_classes=[IsAuthenticated]
     )
     def me(self, request):
-        return Response(
-            UserSerializer(request.user, context={'request': request}).data
+        """Текущий пользователь уже загружен аутентификацией."""
+        user = request.user
+        return conditional_response(
+            request,
+            lambda: Response(
+                UserSerializer(user, context={'request': request}).data
+            ),
+            **self._profile_validators(user, user.pk, user.updated_at, False)
         )
 
     @action(
@@ -60,6 +115,11 @@ class UserViewSet(
         permission_classes=[IsAuthenticated], url_path='set_password'
     )
     def set_password(self, request):
+        """
+        Смена пароля. request.user может быть взят из кеша токенов,
+        поэтому сохраняются только изменённые поля; сохранение сбрасывает
+        записи кеша токенов пользователя (users.signals).
+        """
         ser = SetPasswordSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         if not request.user.check_password(
@@ -70,7 +130,7 @@ class UserViewSet(
                 status=HTTPStatus.BAD_REQUEST
             )
         request.user.set_password(ser.validated_data['new_password'])
-        request.user.save()
+        request.user.save(update_fields=['password', 'updated_at'])
         return Response(status=HTTPStatus.NO_CONTENT)
 
     @action(
@@ -82,7 +142,7 @@ class UserViewSet(
         ser = SetAvatarSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         request.user.avatar = ser.validated_data['avatar']
-        request.user.save()
+        request.user.save(update_fields=['avatar', 'updated_at'])
         return Response(
             {'avatar': request.build_absolute_uri(request.user.avatar.url)},
             status=HTTPStatus.OK
@@ -90,20 +150,57 @@ class UserViewSet(
 
     @set_avatar.mapping.delete
     def delete_avatar(self, request):
-        if request.user.avatar:
-            request.user.avatar.delete(save=True)
+        avatar = request.user.avatar
+        if avatar:
+            delete_variants(avatar.storage, avatar.name, AVATAR_VARIANTS)
+            avatar.delete(save=False)
+            request.user.save(update_fields=['avatar', 'updated_at'])
         return Response(status=HTTPStatus.NO_CONTENT)
 
+    def _get_recipes_limit(self):
+        """Разбирает параметр recipes_limit; некорректное значение — None."""
+        try:
+            limit = int(self.request.query_params['recipes_limit'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return limit if limit >= 0 else None
+
+    def _with_recipes(self, authors, limit):
+        """
+        Подгружает первые limit рецептов каждого автора одним запросом
+        с ROW_NUMBER(), выбирая только поля RecipeMinifiedSerializer.
+        """
+        recipes = Recipe.objects.only(
+            'id', 'author_id', 'name', 'image', 'image_variants_for',
+            'cooking_time'
+        ).order_by('-id')
+        if limit is not None:
+            recipes = recipes.annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=F('id').desc()
+                )
+            ).filter(row_number__lte=limit)
+        return authors.prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
+
     @action(
         detail=False, methods=['get'],
         permission_classes=[IsAuthenticated],
         url_path='subscriptions'
     )
     def subscriptions(self, request):
-        authors = User.objects.filter(following__user=request.user).distinct()
+        limit = self._get_recipes_limit()
+        authors = self._with_recipes(
+            User.objects.filter(follower__user=request.user)
+            .order_by('username'), limit
+        )
         page = self.paginate_queryset(authors)
         ser = UserWithRecipesSerializer(
-            page, many=True, context={'request': request}
+            page, many=True,
+            context={'request': request, 'recipes_limit': limit}
         )
         return self.get_paginated_response(ser.data)
 
@@ -119,26 +216,50 @@ class UserViewSet(
                 {'detail': 'Нельзя подписаться на себя.'},
                 status=HTTPStatus.BAD_REQUEST
             )
-        obj, created = Subscription.objects.get_or_create(
-            user=request.user, author=author
-        )
-        if not created:
+        if not add_subscription(request.user, author):
             return Response(
                 {'detail': 'Уже подписаны.'},
                 status=HTTPStatus.BAD_REQUEST
             )
+        limit = self._get_recipes_limit()
+        author = self._with_recipes(
+            User.objects.filter(pk=author.pk), limit
+        ).get()
         data = UserWithRecipesSerializer(
-            author, context={'request': request}
+            author, context={'request': request, 'recipes_limit': limit}
         ).data
         return Response(data, status=HTTPStatus.CREATED)
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, pk=None):
         author = self.get_object()
-        deleted, _ = request.user.following.filter(author=author).delete()
-        if not deleted:
+        if not remove_subscription(request.user, author):
             return Response(
                 {'detail': 'Подписки не было.'},
                 status=HTTPStatus.BAD_REQUEST
             )
         return Response(status=HTTPStatus.NO_CONTENT)
+
+    @action(
+        detail=False, methods=['post'],
+        permission_classes=[IsAuthenticated],
+        url_path='subscribe'
+    )
+    def subscribe_many(self, request):
+        """
+        Пакетная подписка по списку {"ids": [...]}; отвечает картой
+        итогов по каждому id автора.
+        """
+        ids = get_bulk_ids(request)
+        return bulk_response(
+            bulk_add_subscriptions(request.user, ids),
+            HTTPStatus.CREATED, 'Уже подписаны.',
+            errors={request.user.pk: 'Нельзя подписаться на себя.'}
+        )
+
+    @subscribe_many.mapping.delete
+    def unsubscribe_many(self, request):
+        return bulk_response(
+            bulk_remove_subscriptions(request.user, get_bulk_ids(request)),
+            HTTPStatus.NO_CONTENT, 'Подписки не было.'
+        )